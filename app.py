@@ -1,22 +1,32 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, UploadFile, File, Form
 import asyncio
+import time
 import uuid
 import queue
 import threading
-from src.conv_history import store_chat_history, get_chat_history
+import concurrent.futures
+from src.conv_history import get_session_history, drop_session_history, format_chat_entry, HISTORY_WINDOW
 from src.podcast_agent_threaded import PodcastAgent
 from src.user_handeling_agent import HandelUser
 from src.text_processing import TextProcessing
+from src.summary_cache import summary_cache, text_key, file_key
+from src.document_store import document_store
+from src.session_store import session_store
+from src.vad import Endpointer
+from src.audio_ingest import AudioIngest, RECOGNIZER_RATE
+from src.protocol import Connection, SpeechStream, START_SPEECH, ACK, AUDIO_SEGMENT, TRANSCRIPT, SPEECH_ENDED, ERROR
+from src.clients import get_client
+from src.executors import stt_executor, document_executor, cleanup_executor, executor_stats, ExecutorBusy
+from src.tts import engine as tts_engine, hold_audio, release_audio, sweep_audio, make_audio_config, audio_mime, AUDIO_CONFIG, TTS_ENCODING, TTS_SAMPLE_RATE
+from src.tts_cache import audio_cache_stats, TTS_CACHE_SWEEP_SECONDS
+from src.turn_pipeline import TurnPipeline, Turn, NEXT_SPEAKER
 from pydantic import BaseModel
-import shutil
 import os
 import janus
-import numpy as np
 import base64
 import json
 from fastapi.middleware.cors import CORSMiddleware
 from google.cloud import speech
-import webrtcvad
 from typing import List
 import base64
 
@@ -36,31 +46,47 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-text_summary = ""
 text_processor = TextProcessing()
 
+# OCR and summarisation are blocking, they run off the event loop in the bounded document pool
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+
+
+async def sweep_audio_periodically():
+    """Expire cached audio on a timer, so an idle server still frees the disk."""
+    while True:
+        await asyncio.sleep(TTS_CACHE_SWEEP_SECONDS)
+        try:
+            await cleanup_executor.run(sweep_audio)
+        except ExecutorBusy:
+            pass  # Cleanup is backed up, try again next round
+
+
+@app.on_event("startup")
+async def start_audio_sweep():
+    if TTS_CACHE_SWEEP_SECONDS > 0:
+        # Kept on the app, the event loop only holds a weak reference to tasks
+        app.state.audio_sweep = asyncio.create_task(sweep_audio_periodically())
+
 
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
 
 
+@app.get("/metrics")
+async def metrics():
+    return {"summary_cache": summary_cache.stats(), "sessions": session_store.stats(), "audio_cache": audio_cache_stats(), "tts": tts_engine.stats(), "executors": executor_stats()}
+
+
 
 
 # Audio Streaming Config
-RATE = 16000  # Sample Rate
-BUFFER_SIZE = RATE // 4  # 250ms buffer
-SILENCE_THRESHOLD = 500  # RMS threshold for silence detection
-SILENCE_DURATION = 50 # Seconds of silence to trigger close
+RATE = RECOGNIZER_RATE  # Sample rate the STT stream and the endpointer run at
+STT_INTERIM_INTERVAL = int(os.getenv("STT_INTERIM_INTERVAL_MS", 250)) / 1000  # Min gap between interim transcripts sent
 
-client = speech.SpeechClient()
  # Thread-safe queue
 
-def calculate_rms(chunk):
-    """Calculate RMS value of audio chunk."""
-    audio_data = np.frombuffer(chunk, dtype=np.int16)
-    return np.sqrt(np.mean(np.square(audio_data)))
-
 def audio_generator(audio_queue):
     """Sync generator for Google STT."""
     while True:
@@ -70,15 +96,19 @@ def audio_generator(audio_queue):
         yield speech.StreamingRecognizeRequest(audio_content=chunk)
         audio_queue.sync_q.task_done()
 
-async def process_audio(audio_queue, websocket : WebSocket):
-    """Process audio with Google STT."""
+async def process_audio(audio_queue, connection : Connection, stream : SpeechStream):
+    """Process audio with Google STT, forwarding transcripts while the audio is still streaming.
+
+    Returns the final transcript, "" when there was none.
+    """
     config = speech.RecognitionConfig(
         encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
         sample_rate_hertz=RATE,
         language_code="en-US"
     )
+    # single_utterance: the service finalises as soon as the user stops talking
     streaming_config = speech.StreamingRecognitionConfig(
-        config=config, interim_results=True
+        config=config, interim_results=True, single_utterance=True
     )
 
     response_queue = janus.Queue()
@@ -86,16 +116,27 @@ async def process_audio(audio_queue, websocket : WebSocket):
     def run_streaming():
         """Run blocking STT client."""
         try:
-            responses = client.streaming_recognize(streaming_config, audio_generator(audio_queue))
+            responses = get_client("speech").streaming_recognize(streaming_config, audio_generator(audio_queue))
             for response in responses:
                 response_queue.sync_q.put(response)
             response_queue.sync_q.put(None)
         except Exception as e:
             response_queue.sync_q.put(e)
 
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, run_streaming)
+    def stream_done(future):
+        # Rejected by the pool: run_streaming never ran, report it through the queue instead
+        if not future.cancelled() and future.exception() is not None:
+            response_queue.async_q.put_nowait(future.exception())
 
+    # Streams hold their thread for the whole utterance, so they get their own pool.
+    # Responses are drained below while it runs, not after it returns.
+    recognition = stt_executor.run(run_streaming)
+    recognition.add_done_callback(stream_done)
+
+    last_interim = ""
+    last_interim_at = 0.0
+    final_sent = False
+    final_text = ""
     try:
         while True:
             response = await response_queue.async_q.get()
@@ -103,89 +144,209 @@ async def process_audio(audio_queue, websocket : WebSocket):
                 break
             if isinstance(response, Exception):
                 raise response
+            if final_sent or stream.reason == "cancelled":
+                continue  # Drain until the stream closes
 
             for result in response.results:
                 transcript = result.alternatives[0].transcript
                 if result.is_final:
                     print(f"✅ Final: {transcript}")
-                    await websocket.send_json({"Final" : transcript})
+                    await connection.send(TRANSCRIPT, text=transcript, final=True)
+                    final_sent = True
+                    final_text = transcript
+                    # The utterance is over: stop listening and end the audio so the stream closes now
+                    connection.end_speech("transcribed", stream)
+                    await audio_queue.async_q.put(None)
                     break
-                else:
+
+                now = time.monotonic()
+                if transcript != last_interim and now - last_interim_at >= STT_INTERIM_INTERVAL:
                     print(f"⏳ Interim: {transcript}", end="\r")
+                    await connection.send(TRANSCRIPT, text=transcript, final=False)
+                    last_interim, last_interim_at = transcript, now
+    except ExecutorBusy as e:
+        print(f"STT Error: {e}")
+        connection.end_speech("busy", stream)
+        await connection.send(ERROR, message="Speech recognition is busy, please try again.")
     except Exception as e:
         print(f"STT Error: {e}")
-    
+    return final_text
 
 
-async def process_audio_stream(websocket: WebSocket):
-    """WebSocket with silence detection."""
-    audio_queue = janus.Queue() 
-    transcription_task = asyncio.create_task(process_audio(audio_queue, websocket))
-    silent_chunks = 0
-    chunks_needed = int(SILENCE_DURATION / (BUFFER_SIZE / RATE))  # ~12 chunks
+async def process_audio_stream(connection: Connection, stream: SpeechStream):
+    """Transcribe the utterance the client opened with start_speech.
 
+    Listening stops as soon as the first of these happens: the endpointer hears the user
+    stop talking, the recognizer finalises, or the client sends stop_speech or cancel. The
+    client is then told with speech_ended. stream.start gives the sample_rate, channels and format
+    of the audio frames, which are converted to 16 kHz mono int16 here. Returns the final
+    transcript, "" when there is none or the utterance was cancelled.
+    """
     try:
-        while True:
-            chunk = await websocket.receive_bytes()
-            
-            # Silence detection
-            rms = calculate_rms(chunk)
-            if rms < SILENCE_THRESHOLD:
-                silent_chunks += 1
-                print(f"🛑 Silence detected ({silent_chunks}/{chunks_needed})")
-            else:
-                silent_chunks = 0  # Properly reset on speech
-                print("🎙️ Speech detected")
+        ingest = AudioIngest.from_message(stream.start)
+    except ValueError as e:
+        print(f"Rejected audio stream: {e}")
+        connection.end_speech("rejected", stream)
+        await connection.send(ERROR, message=str(e))
+        await connection.send(SPEECH_ENDED, reason="rejected")
+        return ""
 
-            # Close the WebSocket if sustained silence is detected
-            if silent_chunks >= chunks_needed:
-                print(f"🚫 {SILENCE_DURATION}s of silence detected, ending loop...")
-                break  
+    audio_queue = janus.Queue() 
+    transcription_task = asyncio.create_task(process_audio(audio_queue, connection, stream))
+    endpointer = Endpointer(RATE)
 
-            # Send to processing
-            await audio_queue.async_q.put(chunk)
+    messages = 0
+    try:
+        while not endpointer.ended:
+            chunk = await stream.frames.get()
+            if chunk is None:
+                break  # Ended by the client, the recognizer or a disconnect
+            messages += 1
+
+            # Send to processing in whole STT packets, the trailing silence included
+            for packet in ingest.feed(chunk):
+                await audio_queue.async_q.put(packet)
+                if endpointer.feed(packet):
+                    break
 
-    except Exception as e:
-        print(f"WebSocket error: {e}")
+        connection.end_speech("speech" if endpointer.in_speech else "no_speech", stream)
+        reason = stream.reason
+        print(f"🛑 End of utterance after {endpointer.frames * endpointer.frame_ms} ms ({reason}, {messages} messages)")
+        if not connection.closed:
+            await connection.send(SPEECH_ENDED, reason=reason)
     finally:
+        for packet in ingest.flush():
+            await audio_queue.async_q.put(packet)
         await audio_queue.async_q.put(None)
-        await transcription_task
+        transcript = await transcription_task
         audio_queue.close()
         await audio_queue.wait_closed()
-        print("User function Connection closed")
-        
-        while True:
-            try:
-                pending = await asyncio.wait_for(websocket.receive_json(), timeout=0.1)
-                break
-                print("Flushing pending message:", pending)
-            except KeyError:
-                print("Received message without 'text' key; ignoring.")
-            except asyncio.TimeoutError:
-                break
 
+    return "" if reason == "cancelled" else transcript
 
-        # final_response = await websocket.receive_json()
-        # print("Received final JSON response:", final_response)
+
+async def wait_for_reply(connection: Connection, turn_id, on_speech=None):
+    """After sending a turn, wait for the client to ack it or to start talking.
+
+    Returns None once turn turn_id is acked, or the transcript ("" for none) of the user's
+    utterance. on_speech is called as soon as the user starts talking.
+    """
+    while True:
+        event = await connection.next_event()
+        if event["type"] == ACK and turn_id is not None and event.get("turn") == turn_id:
+            return None
+        if event["type"] == START_SPEECH:
+            if on_speech:
+                on_speech()
+            return await process_audio_stream(connection, event["stream"])
+        # Acks of earlier turns, and stop_speech or cancel arriving after the stream ended
 
 
 class TextInput(BaseModel):
     text: str  
 
 
+def document_id_for(key):
+    """Documents are identified by their content hash, so every worker resolves the same id."""
+    return key.split(":", 1)[1]
+
+
+# Summaries being computed, by content key: identical uploads arriving meanwhile wait for it
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def single_flight(key, compute):
+    """Return compute(), or, when key is already being computed by another thread, wait for that result."""
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        owner = future is None
+        if owner:
+            future = _in_flight[key] = concurrent.futures.Future()
+    if not owner:
+        return future.result()
+
+    try:
+        result = compute()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+
+
+def summarise_text(text):
+    """Summarise text, reusing the cached summary of identical content. Returns (document_id, summary)."""
+    key = text_key(text)
+    cached = summary_cache.get(key)
+    if cached:
+        return document_id_for(key), cached["summary"]
+
+    def compute():
+        # An identical upload may have finished since the lookup above
+        cached = summary_cache.peek(key)
+        if cached:
+            return cached["summary"]
+        summary = text_processor.summarise(text)
+        summary_cache.put(key, summary)
+        return summary
+
+    return document_id_for(key), single_flight(key, compute)
+
+
+def summarise_document(content):
+    """OCR and summarise a PDF, reusing the cached result of identical bytes. Returns (document_id, summary)."""
+    key = file_key(content)
+    cached = summary_cache.get(key)
+    if cached:
+        return document_id_for(key), cached["summary"]
+
+    def compute():
+        cached = summary_cache.peek(key)
+        if cached:
+            return cached["summary"]
+        extracted_text = text_processor.extract_text_from_bytes(content)
+        _, summary = summarise_text(extracted_text)
+        summary_cache.put(key, summary, extracted_text)
+        return summary
+
+    return document_id_for(key), single_flight(key, compute)
+
+
+async def get_document_summary(document_id):
+    """Summary a session talks about: shared store first, then this machine's summary cache.
+
+    Returns None when the document is unknown or expired.
+    """
+    summary = await document_store.get(document_id)
+    if summary is None:
+        # SQLite lookup, off the event loop; peek so sessions do not skew the upload hit rate
+        cached = await document_executor.run(summary_cache.peek, f"file:{document_id}", f"text:{document_id}")
+        if cached is None:
+            return None
+        summary = cached["summary"]
+        await document_store.put(document_id, summary)
+    return summary
+
+
 @app.post("/process-text")
 async def process_text(text: TextInput):
     """
     Endpoint to process plain text input.
     """
-    global text_summary
     if not text.text:
         raise HTTPException(status_code=400, detail="Text cannot be empty.")
 
     try:
-        text_summary = text_processor.summarise(text.text)
-        return {"summary": text_summary}
-    
+        document_id, text_summary = await document_executor.run(summarise_text, text.text)
+        await document_store.put(document_id, text_summary)
+        return {"summary": text_summary, "document_id": document_id}
+
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -196,30 +357,76 @@ async def process_file(file: UploadFile = File(...)):
     Endpoint to process a PDF file and extract text.
     """
     try:
-        global text_summary
-        temp_file_path = f"src/pdf_{uuid.uuid4()}.pdf"
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # UploadFile is spooled by Starlette and read in a worker thread, the PDF never goes through src/
+        content = await file.read(MAX_UPLOAD_BYTES + 1)
+        if len(content) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="File too large.")
+
+        document_id, text_summary = await document_executor.run(summarise_document, content)
+        await document_store.put(document_id, text_summary)
+        return {"summary": text_summary, "document_id": document_id}
+
+    except HTTPException:
+        raise
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
 
-        extracted_text = text_processor.extract_text_from_pdf(temp_file_path)
+# Stream each sentence's audio as soon as it is synthesized instead of the whole turn
+STREAM_TTS = os.getenv("STREAM_TTS", "true").lower() == "true"
 
-        os.remove(temp_file_path)
 
-        text_summary = text_processor.summarise(extracted_text)
-        return {"summary": text_summary}
+async def send_turn(connection : Connection, turn : Turn, user_id=None):
+    """Send a turn to the client, one audio_segment message per segment as each one finishes.
+
+    With AUDIO_DELIVERY=websocket a segment's audio is bytes: its message says "audio": "binary",
+    gives the MIME type in "format", and the audio follows as the next, binary, frame.
+    Stops once the user starts talking (barge-in), the client drops what it has of the turn.
+    Returns the turn's id, which the client acks once it has played.
+    """
+    turn_id = connection.next_turn_id()
+    total = len(turn.audio)
+    try:
+        for index, segment in enumerate(turn.audio):
+            try:
+                audio = await segment
+            except ExecutorBusy as e:
+                # Overloaded: send the text without this segment's audio rather than stall the turn
+                print(f"TTS Error: {e}")
+                audio = None
+            if connection.speaking:
+                break
+            # Held from here until the session is released, the client may still fetch it
+            if user_id:
+                hold_audio(user_id, audio)
+            binary = isinstance(audio, bytes)
+            message = {"turn": turn_id, "speaker": turn.speaker, "text": turn.text, "audio": "binary" if binary else audio, "stage": turn.stage, "segment": index, "segments": total}
+            if binary:
+                message["format"] = audio_mime(audio)
+            await connection.send(AUDIO_SEGMENT, audio if binary else None, **message)
+    finally:
+        # Stopped early (barge-in, or the client disconnected): the rest of the turn is not needed
+        for segment in turn.audio:
+            segment.cancel()
+
+    if not total:
+        await connection.send(AUDIO_SEGMENT, turn=turn_id, speaker=turn.speaker, text=turn.text, audio=None, stage=turn.stage, segment=0, segments=0)
+    return turn_id
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
 
-active_users = {}
+async def send_agent_turn(connection : Connection, agent, speaker, text, conversation_stage, user_id=None, audio_config=AUDIO_CONFIG):
+    """Synthesize an agent turn and send it to the client, returning its turn id."""
+    audio = agent.start_tts(text, speaker, STREAM_TTS, audio_config)
+    return await send_turn(connection, Turn(speaker, text, conversation_stage, audio), user_id)
 
 
-async def endpoint_user(user_id, user_message,  websocket : WebSocket):
+async def endpoint_user(user_id, user_message,  connection : Connection, pdf_content="", audio_config=AUDIO_CONFIG):
 
-    user_tts_queue = queue.Queue()
     user_output_queue = queue.Queue()
     handleUser = HandelUser()
+    history = get_session_history(user_id)
     conversation_stage = 0
     
     
@@ -228,10 +435,12 @@ async def endpoint_user(user_id, user_message,  websocket : WebSocket):
         end_of_query_a = False
         end_of_query_b = False
         user_input = user_message
-        conversation_history = get_chat_history(user_id)
-        store_chat_history(user_id, "User", user_input, conversation_stage)
-        conversation_history = get_chat_history(user_id)
-        await handleUser.generate_agent_response(conversation_history, conversation_stage, user_output_queue, pdf_content = text_summary)
+        # The user's entry is stored together with the replies below, in one round trip
+        await history.get()
+        history_lines = [*history.lines, format_chat_entry("User", user_input, conversation_stage)]
+        conversation_history = "\n".join(history_lines[-HISTORY_WINDOW:])
+        user_stage = conversation_stage
+        await handleUser.generate_agent_response(conversation_history, conversation_stage, user_output_queue, pdf_content = pdf_content)
         alex_output, conversation_stage, emma_output = user_output_queue.get()
         
         
@@ -246,149 +455,116 @@ async def endpoint_user(user_id, user_message,  websocket : WebSocket):
             print(emma_output)  
        
         # Store history per user
-        store_chat_history(user_id, "Alex", alex_output, conversation_stage)
-        store_chat_history(user_id, "Emma", emma_output, conversation_stage)
+        await history.store(
+            ("User", user_input, user_stage),
+            ("Alex", alex_output, conversation_stage),
+            ("Emma", emma_output, conversation_stage),
+        )
         # Generate text-to-speech for both responses
-        alex_tts_task = asyncio.create_task(handleUser.generate_tts(text = alex_output, gender= "male", output_queue=user_tts_queue) )
-        
-        
-        await alex_tts_task
-        file_path_male = user_tts_queue.get()
         print(alex_output)
-        await websocket.send_json({"speaker": "Alex", "text": alex_output, "audio": file_path_male, "stage": conversation_stage})
-        emma_tts_task = asyncio.create_task(handleUser.generate_tts(text = emma_output, gender= "female", output_queue=user_tts_queue) )
+        turn_id = await send_agent_turn(connection, handleUser, "Alex", alex_output, conversation_stage, user_id, audio_config)
 
         print("alex done")
-        await emma_tts_task
-        response = await websocket.receive_json()
-        print(response)
-        
-        if response['message'] == "chunks":
-            await process_audio_stream(websocket) 
-            print("audio procesing ended")# Process audio properly
-                # await websocket.send_json({"FINAL": final_text})
-            response1 = await websocket.receive_json()
-            print(response1)
-            if response1['message'] == "Yes":
-                print(response1['input'])
-                await endpoint_user(user_id, response1['input'], websocket)
-                print("Loop ended")
-                break
+        # The user either lets the turn play out or interrupts it by talking
+        transcript = await wait_for_reply(connection, turn_id)
+        if transcript:
+            print(transcript)
+            await endpoint_user(user_id, transcript, connection, pdf_content, audio_config)
+            print("Loop ended")
+            break
         
         if end_of_query_a == True:
             break
 
-        file_path_female = user_tts_queue.get()
-        await websocket.send_json({"speaker": "Emma", "text": emma_output, "audio": file_path_female, "stage": conversation_stage})
+        turn_id = await send_agent_turn(connection, handleUser, "Emma", emma_output, conversation_stage, user_id, audio_config)
         print(emma_output)
-        response = await websocket.receive_json()
-        print(response)
-        
-        if response['message'] == "chunks":
-         
-            await process_audio_stream(websocket) 
-            print("audio procesing ended")# Process audio properly
-                # await websocket.send_json({"FINAL": final_text})
-            response1 = await websocket.receive_json()
-            print(response1)
-            if response1['message'] == "Yes":
-                print(response1['input'])
-                await endpoint_user(user_id, response1['input'], websocket)
-                print("Loop ended")
-                break
+        transcript = await wait_for_reply(connection, turn_id)
+        if transcript:
+            print(transcript)
+            await endpoint_user(user_id, transcript, connection, pdf_content, audio_config)
+            print("Loop ended")
+            break
         
         if end_of_query_b == True:
             break
 
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, document_id: str = "", encoding: str = TTS_ENCODING, sample_rate: int = TTS_SAMPLE_RATE):
+    # Audio format of the session: e.g. ?encoding=OGG_OPUS for small payloads, LINEAR16 for raw PCM
+    try:
+        audio_config = make_audio_config(encoding, sample_rate)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    # The session talks about the document returned by /process-text or /process-file
+    pdf_content = ""
+    if document_id:
+        try:
+            pdf_content = await get_document_summary(document_id)
+        except ExecutorBusy:
+            await websocket.close(code=1013, reason="Server is busy, try again later")
+            return
+        if pdf_content is None:
+            await websocket.close(code=1008, reason="Unknown or expired document_id, upload the document again")
+            return
+
     await websocket.accept()
     user_id = str(uuid.uuid4())  
-    active_users[user_id] = websocket  
+    # The websocket stays on this worker, its metadata and history are shared through Redis
+    await session_store.register(user_id, document_id)
 
     podcast_agent = PodcastAgent()
-    alex_response_queue = queue.Queue()
-    emma_response_queue = queue.Queue()
-    alex_tts_queue = queue.Queue()
-    emma_tts_queue = queue.Queue()
+    # Keeps the next turns (text and audio) generated while the current one plays
+    history = get_session_history(user_id)
+    pipeline = TurnPipeline(podcast_agent, history, pdf_content, split_audio=STREAM_TTS, audio_config=audio_config)
+    # Reads everything the client sends from here on, see src/protocol.py
+    connection = Connection(websocket)
+    connection.start()
 
     try:
-        # Generate initial AI response
-        await podcast_agent.generate_alex_response("", "1", alex_response_queue, pdf_content=text_summary)
-        alex_output, conversation_stage = alex_response_queue.get()
-        store_chat_history(user_id, "Alex", alex_output, conversation_stage)
-        await podcast_agent.generate_tts(alex_output, "male", alex_tts_queue)
-
-        conversation_history = get_chat_history(user_id)
-        await podcast_agent.generate_emma_response(conversation_history, conversation_stage, emma_response_queue, pdf_content=text_summary)
-        emma_output, conversation_stage = emma_response_queue.get()
-        store_chat_history(user_id, "Emma", emma_output, conversation_stage)
-        await podcast_agent.generate_tts(emma_output, "female", emma_tts_queue)
-
-        conversation_history = get_chat_history(user_id)
-        await podcast_agent.generate_alex_response(conversation_history, conversation_stage, alex_response_queue, pdf_content=text_summary)
-        alex_output, conversation_stage = alex_response_queue.get()
-        store_chat_history(user_id, "Alex", alex_output, conversation_stage)
+        pipeline.start("Alex", "1")
+        played = None  # Last turn sent to the client
         
         while True:
-            conversation_history = get_chat_history(user_id)
-            # Play Alex's response
-            alex_tts_task = asyncio.create_task(podcast_agent.generate_tts(alex_output, "male", alex_tts_queue))
-            emma_task = asyncio.create_task(podcast_agent.generate_emma_response(conversation_history, conversation_stage, emma_response_queue, text_summary))
-
-            file_path_male = alex_tts_queue.get()
-            await websocket.send_json({"speaker": "Alex", "text": alex_output, "audio": file_path_male, "stage": conversation_stage})
-
-            await alex_tts_task
-            await emma_task
-
-            response = await websocket.receive_json()
-
-            # If user sends "chunks", start audio processing
-            if response['message'] == "chunks":
-                
-                await process_audio_stream(websocket) 
-                print("audio procesing ended")# Process audio properly
-                # await websocket.send_json({"FINAL": final_text})
-                response1 = await websocket.receive_json()
-                print(response1)
-                if response1['message'] == "Yes":
-                    print(response1['input'])
-                    await endpoint_user(user_id, response1['input'], websocket)
-                    print("Loop ended")
-
-            emma_output, conversation_stage = emma_response_queue.get()
-            store_chat_history(user_id, "Emma", emma_output, conversation_stage)
-
-            conversation_history = get_chat_history(user_id)
-
-            # Play Emma's response
-            alex_task = asyncio.create_task(podcast_agent.generate_alex_response(conversation_history, conversation_stage, alex_response_queue, text_summary))
-            emma_tts_task = asyncio.create_task(podcast_agent.generate_tts(emma_output, "female", emma_tts_queue))
-
-            file_path_female = emma_tts_queue.get()
-            await websocket.send_json({"speaker": "Emma", "text": emma_output, "audio": file_path_female, "stage": conversation_stage})
-
-            await emma_tts_task
-            await alex_task
-
-            response = await websocket.receive_json()
-
-            if response['message'] == "chunks":
-                await process_audio_stream(websocket) 
-                print("audio procesing ended")# Process audio properly
-                # await websocket.send_json({"FINAL": final_text})
-                response1 = await websocket.receive_json()
-                print(response1)
-                if response1['message'] == "Yes":
-                    print(response1['input'])
-                    await endpoint_user(user_id, response1['input'], websocket)
+            turn = await pipeline.next_turn()
+            turn_id = None
+            # A turn that became ready while the user is already talking is not sent
+            if not connection.speaking:
+                await asyncio.gather(history.store((turn.speaker, turn.text, turn.stage)), session_store.touch(user_id))
+                turn_id = await send_turn(connection, turn, user_id)
+                played = turn
+            else:
+                for segment in turn.audio:
+                    segment.cancel()
+
+            # If the user starts talking, drop the speculative turns and transcribe them
+            transcript = await wait_for_reply(connection, turn_id, on_speech=pipeline.invalidate)
+            if transcript is not None:
+                if transcript:
+                    print(transcript)
+                    await endpoint_user(user_id, transcript, connection, pdf_content, audio_config)
                     print("Loop ended")
 
-            alex_output, conversation_stage = alex_response_queue.get()
-            store_chat_history(user_id, "Alex", alex_output, conversation_stage)
+                # Resume the podcast from the history that now includes the user's turn
+                if played:
+                    pipeline.start(NEXT_SPEAKER[played.speaker], played.stage)
+                else:
+                    pipeline.start("Alex", "1")
 
     except WebSocketDisconnect:
         print(f"User {user_id} disconnected")
-        del active_users[user_id]
\ No newline at end of file
+    except ExecutorBusy as e:
+        print(f"User {user_id} rejected: {e}")
+        await websocket.close(code=1013, reason="Server is busy, try again later")
+    finally:
+        connection.close()
+        pipeline.invalidate()
+        drop_session_history(user_id)
+        # Releasing the session's audio can be disk work, hand it to a thread without waiting
+        try:
+            cleanup_executor.submit(release_audio, user_id)
+        except ExecutorBusy:
+            release_audio(user_id)
+        await session_store.unregister(user_id)
\ No newline at end of file
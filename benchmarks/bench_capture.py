@@ -0,0 +1,82 @@
+"""Server CPU per listening user against the size of the client's capture frames.
+
+    python -m benchmarks.bench_capture --seconds 30
+
+Replays the receive path of process_audio_stream (AudioIngest, Endpointer, the janus hop to
+a thread standing in for the STT request generator) for one stream, with frames as the
+AudioWorklet used to send them (one 128-sample quantum per message) and batched ones.
+A 48 kHz device is now decimated to 16 kHz in the worklet, so the server sees the 16k
+rows; the 48k rows are what a client announcing its native rate costs.
+Reports websocket messages per second per user and CPU time per second of audio.
+"""
+import time
+import asyncio
+import argparse
+import threading
+
+import janus
+import numpy as np
+
+from src.audio_ingest import AudioIngest, RECOGNIZER_RATE
+from src.vad import Endpointer, EnergyDetector
+
+# (label, client sample rate, samples per message)
+CAPTURE_MODES = [
+    ("48k quantum", 48000, 128),
+    ("16k quantum", 16000, 128),
+    ("48k 20ms", 48000, 960),
+    ("48k 100ms", 48000, 4800),
+    ("16k 20ms", 16000, 320),
+    ("16k 50ms", 16000, 800),
+    ("16k 100ms", 16000, 1600),
+]
+
+
+def capture(seconds, rate, rng):
+    t = np.arange(int(seconds * rate)) / rate
+    return (np.sin(2 * np.pi * 180 * t) * 6000 + rng.normal(0, 200, t.size)).astype("<i2").tobytes()
+
+
+async def receive_path(audio, rate, frame_samples):
+    ingest = AudioIngest(sample_rate=rate)
+    # Never ends the utterance, so the whole capture is measured
+    endpointer = Endpointer(RECOGNIZER_RATE, detector=EnergyDetector(), no_speech_timeout_ms=10 ** 9)
+    audio_queue = janus.Queue()
+
+    def drain():
+        while audio_queue.sync_q.get() is not None:
+            pass
+
+    consumer = threading.Thread(target=drain)
+    consumer.start()
+    frame = frame_samples * 2
+    messages = 0
+    for offset in range(0, len(audio), frame):
+        messages += 1
+        for packet in ingest.feed(audio[offset:offset + frame]):
+            await audio_queue.async_q.put(packet)
+            endpointer.feed(packet)
+    await audio_queue.async_q.put(None)
+    await asyncio.get_running_loop().run_in_executor(None, consumer.join)
+    audio_queue.close()
+    await audio_queue.wait_closed()
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=30, help="audio per measurement")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'capture':<12} {'msgs/s':>8} {'cpu ms per audio s':>19} {'users per core':>15}")
+    for label, rate, frame_samples in CAPTURE_MODES:
+        audio = capture(args.seconds, rate, rng)
+        start = time.process_time()
+        messages = asyncio.run(receive_path(audio, rate, frame_samples))
+        cpu_ms = (time.process_time() - start) * 1000 / args.seconds
+        print(f"{label:<12} {messages / args.seconds:>8,.0f} {cpu_ms:>19.2f} {1000 / cpu_ms:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
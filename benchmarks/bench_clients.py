@@ -0,0 +1,76 @@
+"""Per-call latency of building a Google client on every request versus the shared registry.
+
+    python -m benchmarks.bench_clients --calls 50          # client setup only, works offline
+    python -m benchmarks.bench_clients --calls 20 --live   # full TTS round trips, needs credentials
+"""
+import argparse
+import statistics
+import time
+
+from google.auth.credentials import AnonymousCredentials
+
+from src import clients
+
+
+def offline_factories():
+    from google import genai
+    from google.api_core.client_options import ClientOptions
+    from google.cloud import documentai, texttospeech
+
+    return {
+        "tts": lambda: texttospeech.TextToSpeechClient(credentials=AnonymousCredentials()),
+        "documentai": lambda: documentai.DocumentProcessorServiceClient(
+            credentials=AnonymousCredentials(),
+            client_options=ClientOptions(api_endpoint=f"{clients.LOCATION}-documentai.googleapis.com"),
+        ),
+        "genai": lambda: genai.Client(api_key="benchmark"),
+    }
+
+
+def live_call(client):
+    from google.cloud import texttospeech
+
+    client.synthesize_speech(
+        input=texttospeech.SynthesisInput(text="thik hai"),
+        voice=texttospeech.VoiceSelectionParams(language_code="hi-IN", name="hi-IN-Chirp3-HD-Charon"),
+        audio_config=texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3),
+    )
+
+
+def measure(get, calls, work=None):
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        client = get()
+        if work:
+            work(client)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    ordered = sorted(timings)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    print(f"{label:<32} mean {statistics.mean(timings):9.3f} ms   p50 {statistics.median(timings):9.3f} ms   p95 {p95:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--live", action="store_true", help="issue a real synthesize_speech call per iteration")
+    args = parser.parse_args()
+
+    if args.live:
+        factory = clients.CLIENT_FACTORIES["tts"][0]
+        report("tts new client per call", measure(factory, args.calls, live_call))
+        report("tts shared client", measure(lambda: clients.get_client("tts"), args.calls, live_call))
+        return
+
+    for name, factory in offline_factories().items():
+        clients.register_client(name, factory)
+        report(f"{name} new client per call", measure(factory, args.calls))
+        report(f"{name} shared client", measure(lambda: clients.get_client(name), args.calls))
+
+
+if __name__ == "__main__":
+    main()
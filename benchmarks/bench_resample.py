@@ -0,0 +1,52 @@
+"""Cost per stream of normalising client audio to 16 kHz mono int16 (src/audio_ingest.py).
+
+    python -m benchmarks.bench_resample --seconds 30
+
+Feeds int16 audio at common device rates through AudioIngest in chunks the size a browser
+sends (128 samples, one AudioWorklet quantum) and larger batched ones, and reports how many
+seconds of audio one core converts per second of CPU (x realtime) and the CPU share of a
+single live stream.
+"""
+import time
+import argparse
+
+import numpy as np
+
+from src.audio_ingest import AudioIngest
+
+
+def tone(seconds, rate, rng):
+    t = np.arange(int(seconds * rate)) / rate
+    signal = np.sin(2 * np.pi * 220 * t) * 8000 + rng.normal(0, 200, t.size)
+    return signal.astype("<i2").tobytes()
+
+
+def convert(rate, chunk_samples, audio):
+    ingest = AudioIngest(sample_rate=rate)
+    chunk = chunk_samples * 2
+    start = time.perf_counter()
+    packets = 0
+    for offset in range(0, len(audio), chunk):
+        packets += len(ingest.feed(audio[offset:offset + chunk]))
+    packets += len(ingest.flush())
+    return time.perf_counter() - start, packets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=30, help="audio per measurement")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'input':>8} {'chunk':>8} {'x realtime':>11} {'cpu/stream':>11} {'packets':>8}")
+    for rate in (48000, 44100, 16000):
+        audio = tone(args.seconds, rate, rng)
+        for chunk_ms in (128 * 1000 / rate, 20, 100):
+            chunk_samples = max(1, round(rate * chunk_ms / 1000))
+            elapsed, packets = convert(rate, chunk_samples, audio)
+            speed = args.seconds / elapsed
+            print(f"{rate:>7}Hz {chunk_ms:>6.1f}ms {speed:>10,.0f}x {100 / speed:>10.2f}% {packets:>8}")
+
+
+if __name__ == "__main__":
+    main()
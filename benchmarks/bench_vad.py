@@ -0,0 +1,70 @@
+"""Frames per second per core of the endpointing stage (src/vad.py), per detector and frame size.
+
+    python -m benchmarks.bench_vad --seconds 60
+
+Runs single-threaded, so frames/s is per core. Also reports where each detector ends a
+synthetic utterance (1.5 s of voiced signal, then silence) compared with the configured
+end-of-speech timeout.
+"""
+import time
+import argparse
+
+import numpy as np
+
+from src.vad import Endpointer, EnergyDetector, WebRTCDetector, END_OF_SPEECH_MS
+
+RATE = 16000
+
+
+def synthetic_speech(seconds, rng):
+    """Voiced-like signal: a 150 Hz pulse train with harmonics, amplitude-modulated at syllable rate."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    voice = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 8))
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    noise = rng.normal(0, 0.02, t.size)
+    return np.clip((voice * envelope / 3 + noise) * 12000, -32768, 32767).astype(np.int16)
+
+
+def silence(seconds, rng):
+    return rng.normal(0, 30, int(seconds * RATE)).astype(np.int16)
+
+
+def throughput(detector, frame_ms, audio):
+    frames = audio[:audio.size - audio.size % (RATE * frame_ms // 1000)].reshape(-1, RATE * frame_ms // 1000)
+    start = time.perf_counter()
+    detector.voiced(frames, RATE)
+    return frames.shape[0] / (time.perf_counter() - start)
+
+
+def end_of_speech(detector, frame_ms, utterance, chunk_ms=100):
+    """Milliseconds of audio consumed before the endpointer closed the utterance."""
+    endpointer = Endpointer(RATE, frame_ms=frame_ms, detector=detector)
+    chunk = RATE * chunk_ms // 1000 * 2
+    data = utterance.tobytes()
+    for offset in range(0, len(data), chunk):
+        if endpointer.feed(data[offset:offset + chunk]):
+            return endpointer.frames * frame_ms
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60, help="audio per measurement")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    audio = np.concatenate([synthetic_speech(args.seconds / 2, rng), silence(args.seconds / 2, rng)])
+    utterance = np.concatenate([silence(0.3, rng), synthetic_speech(1.5, rng), silence(3, rng)])
+
+    detectors = {"energy": EnergyDetector, "webrtc": WebRTCDetector}
+    print(f"{'detector':<8} {'frame':>6} {'frames/s':>12} {'x realtime':>11} {'ended at ms':>12}")
+    for name, make in detectors.items():
+        for frame_ms in (10, 20, 30):
+            rate = throughput(make(), frame_ms, audio)
+            ended = end_of_speech(make(), frame_ms, utterance)
+            print(f"{name:<8} {frame_ms:>4}ms {rate:>12,.0f} {rate * frame_ms / 1000:>10,.0f}x {str(ended):>12}")
+    print(f"\nspeech ends at 1800 ms, END_OF_SPEECH_MS={END_OF_SPEECH_MS}: expect ~{1800 + END_OF_SPEECH_MS} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Load generator for the podcast server: many concurrent /ws sessions, per-stage latency percentiles.
+
+Run it against a server using the local stand-in backends so only our own overhead is measured:
+
+    BACKEND=fake uvicorn app:app --port 8000
+    python -m benchmarks.load_test --sessions 200 --turns 6 --play-ms 2000 --upload
+
+or let the harness start the server itself:
+
+    python -m benchmarks.load_test --spawn --sessions 200 --turns 6
+
+Stages (all measured from the client side):
+    upload       POST /process-text round trip
+    connect      websocket handshake
+    first_audio  socket open -> first audio segment of the first turn
+    turn_gap     ack of a turn -> first audio segment of the next turn
+    segment_gap  time between audio segments of the same turn
+"""
+import os
+import sys
+import time
+import json
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import defaultdict
+
+import httpx
+import websockets
+
+SAMPLE_TEXT = " ".join(["Artificial Intelligence is changing how software is written and secured."] * 20)
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.turns = 0
+        self.messages = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def add(self, stage, seconds):
+        self.samples[stage].append(seconds * 1000)
+
+    def report(self, elapsed):
+        print(f"{'stage':<12} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+        for stage in ("upload", "connect", "first_audio", "turn_gap", "segment_gap"):
+            ordered = sorted(self.samples.get(stage, []))
+            if not ordered:
+                continue
+            print(f"{stage:<12} {len(ordered):>7} {percentile(ordered, 0.50):>10.1f} {percentile(ordered, 0.95):>10.1f} "
+                  f"{percentile(ordered, 0.99):>10.1f} {ordered[-1]:>10.1f}")
+        print(f"\n{self.turns} turns, {self.messages} messages, {self.errors} failed sessions in {elapsed:.1f} s")
+        print(f"throughput: {self.turns / elapsed:.1f} turns/s, {self.messages / elapsed:.1f} messages/s")
+        if self.turns:
+            print(f"received: {self.bytes / self.turns / 1024:.1f} KiB per turn")
+
+
+async def run_session(base_url, turns, upload, play_ms, recorder, encoding=None):
+    ws_url = base_url.replace("http", "ws", 1) + "/ws?"
+    if encoding:
+        ws_url += f"encoding={encoding}&"
+    try:
+        if upload:
+            async with httpx.AsyncClient(timeout=120) as http:
+                start = time.perf_counter()
+                response = await http.post(f"{base_url}/process-text", json={"text": SAMPLE_TEXT})
+                response.raise_for_status()
+                recorder.add("upload", time.perf_counter() - start)
+                ws_url += f"document_id={response.json()['document_id']}"
+
+        start = time.perf_counter()
+        async with websockets.connect(ws_url, max_size=None) as websocket:
+            opened = time.perf_counter()
+            recorder.add("connect", opened - start)
+            ack_time = None
+            last_message = None
+            played = 0
+            seq = 0
+
+            while played < turns:
+                message = await websocket.recv()
+                now = time.perf_counter()
+                recorder.bytes += len(message)
+                if isinstance(message, bytes):
+                    continue
+                data = json.loads(message)
+                if data["type"] != "audio_segment":
+                    continue
+
+                recorder.messages += 1
+                segment = data.get("segment", 0)
+                segments = data.get("segments", 1)
+                if segment == 0:
+                    recorder.add("first_audio" if ack_time is None else "turn_gap", now - (ack_time or opened))
+                else:
+                    recorder.add("segment_gap", now - last_message)
+                last_message = now
+
+                if segment >= segments - 1:
+                    # Simulated playback: the client acks once the whole turn has been heard
+                    await asyncio.sleep(play_ms * segments / 1000)
+                    played += 1
+                    recorder.turns += 1
+                    seq += 1
+                    await websocket.send(json.dumps({"type": "ack", "seq": seq, "turn": data["turn"]}))
+                    ack_time = time.perf_counter()
+    except Exception as e:
+        recorder.errors += 1
+        print(f"session failed: {e!r}", file=sys.stderr)
+
+
+def spawn_server(port, workers, extra_env):
+    env = {**os.environ, "BACKEND": "fake", **extra_env}
+    command = [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+async def run(args):
+    recorder = Recorder()
+    limit = asyncio.Semaphore(args.concurrency or args.sessions)
+
+    async def limited():
+        async with limit:
+            await run_session(args.url, args.turns, args.upload, args.play_ms, recorder, args.encoding)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    recorder.report(elapsed)
+    return recorder, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=0, help="max sessions open at once (default: all)")
+    parser.add_argument("--turns", type=int, default=6, help="turns played per session")
+    parser.add_argument("--play-ms", type=int, default=0, help="simulated playback time per audio segment before acking")
+    parser.add_argument("--upload", action="store_true", help="POST /process-text before each session")
+    parser.add_argument("--spawn", action="store_true", help="start a BACKEND=fake server for the run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when spawning")
+    parser.add_argument("--encoding", choices=("MP3", "OGG_OPUS", "LINEAR16"), help="audio encoding requested by each session")
+    parser.add_argument("--audio-delivery", choices=("file", "inline", "websocket"),
+                        help="AUDIO_DELIVERY of the spawned server (default: file, inline with several workers)")
+    args = parser.parse_args()
+
+    process = None
+    if args.spawn:
+        # Several workers do not share frontend/src/assets, so send the audio with the turn
+        extra_env = {"AUDIO_DELIVERY": "inline"} if args.workers > 1 else {}
+        if args.audio_delivery:
+            extra_env["AUDIO_DELIVERY"] = args.audio_delivery
+        process = spawn_server(int(args.url.rsplit(":", 1)[1]), args.workers, extra_env)
+    try:
+        asyncio.run(run(args))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Throughput of the podcast server as the number of uvicorn workers grows.
+
+Starts a BACKEND=fake server per worker count, drives the same load_test workload against each
+and reports turns/s, speedup over one worker and scaling efficiency:
+
+    python -m benchmarks.scaling --workers 1 2 4 --sessions 400 --turns 4
+
+Audio is delivered inline (AUDIO_DELIVERY=inline) so no session depends on a worker's local files.
+Speedup can only approach the worker count when the box has at least that many idle cores.
+"""
+import os
+import asyncio
+import argparse
+from types import SimpleNamespace
+
+from .load_test import run, spawn_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--sessions", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=0)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--play-ms", type=int, default=0)
+    parser.add_argument("--upload", action="store_true")
+    args = parser.parse_args()
+
+    # Short backend latencies keep the run CPU bound, which is what extra workers help with
+    env = {
+        "AUDIO_DELIVERY": "inline",
+        "FAKE_LLM_LATENCY_MS": os.getenv("FAKE_LLM_LATENCY_MS", "20"),
+        "FAKE_TTS_LATENCY_MS": os.getenv("FAKE_TTS_LATENCY_MS", "10"),
+    }
+
+    results = {}
+    for workers in args.workers:
+        print(f"\n== {workers} worker(s), {os.cpu_count()} cpu(s) ==")
+        port = args.port + workers
+        process = spawn_server(port, workers, env)
+        try:
+            load = SimpleNamespace(
+                url=f"http://127.0.0.1:{port}",
+                sessions=args.sessions,
+                concurrency=args.concurrency,
+                turns=args.turns,
+                play_ms=args.play_ms,
+                upload=args.upload,
+                encoding=None,
+            )
+            recorder, elapsed = asyncio.run(run(load))
+            results[workers] = recorder.turns / elapsed
+        finally:
+            process.terminate()
+            process.wait()
+
+    baseline = results[args.workers[0]] / args.workers[0]
+    print(f"\n{'workers':>7} {'turns/s':>10} {'speedup':>8} {'efficiency':>10}")
+    for workers, throughput in results.items():
+        speedup = throughput / baseline
+        print(f"{workers:>7} {throughput:>10.1f} {speedup:>8.2f} {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,101 @@
+// Collects microphone audio into frames of frameMs before posting them, instead of one
+// message per 128-sample render quantum. Options (processorOptions):
+//   frameMs     length of each posted frame, 20-100 ms (default 100)
+//   decimation  keep every n-th sample after an anti-aliasing low-pass (default 1, the
+//               context's native rate); other rates are resampled by the server
 class AudioProcessor extends AudioWorkletProcessor {
+    constructor(options) {
+        super();
+        const { frameMs = 100, decimation = 1 } = options.processorOptions || {};
+        this.decimation = Math.max(1, Math.round(decimation));
+        this.filter = this.decimation > 1 ? lowPass(this.decimation) : null;
+        if (this.filter) {
+            // Last filter.length input samples, stored twice so a window never wraps
+            this.history = new Float32Array(2 * this.filter.length);
+            this.position = 0;
+            this.phase = 0;
+        }
+        const rate = sampleRate / this.decimation;
+        this.frame = new Int16Array(Math.round(rate * Math.min(100, Math.max(20, frameMs)) / 1000));
+        this.filled = 0;
+    }
+
     process(inputs) {
         const input = inputs[0];
         if (input.length > 0) {
             const rawData = input[0];
-            const int16Data = convertFloat32ToInt16(rawData);
-            this.port.postMessage(int16Data);
+            for (let i = 0; i < rawData.length; i++) {
+                if (this.filter) {
+                    const sample = this.decimate(rawData[i]);
+                    if (sample !== null) this.push(sample);
+                } else {
+                    this.push(rawData[i]);
+                }
+            }
         }
         return true;
     }
+
+    // Filter and downsample one input sample; returns an output sample every decimation-th call
+    decimate(sample) {
+        const taps = this.filter.length;
+        this.history[this.position] = sample;
+        this.history[this.position + taps] = sample;
+        this.position = (this.position + 1) % taps;
+        this.phase = (this.phase + 1) % this.decimation;
+        if (this.phase !== 0) return null;
+
+        // history[position .. position + taps) runs from the oldest sample to the newest
+        let sum = 0;
+        for (let j = 0; j < taps; j++) {
+            sum += this.history[this.position + j] * this.filter[taps - 1 - j];
+        }
+        return sum;
+    }
+
+    push(sample) {
+        this.frame[this.filled++] = convertFloat32ToInt16(sample);
+        if (this.filled === this.frame.length) {
+            // Transfer a copy, the frame buffer is reused for the next one
+            const frame = this.frame.slice();
+            this.port.postMessage(frame.buffer, [frame.buffer]);
+            this.filled = 0;
+        }
+    }
+}
+
+// Kaiser-windowed sinc low-pass at the decimated Nyquist rate, as src/audio_ingest.py designs it
+const ZERO_CROSSINGS = 16;
+const KAISER_BETA = 8.0; // ~80 dB stopband
+
+function lowPass(decimation) {
+    const length = 2 * ZERO_CROSSINGS * decimation;
+    const cutoff = 0.5 / decimation;
+    const center = (length - 1) / 2;
+    const taps = new Float32Array(length);
+    for (let n = 0; n < length; n++) {
+        const x = 2 * cutoff * (n - center);
+        const sinc = x === 0 ? 1 : Math.sin(Math.PI * x) / (Math.PI * x);
+        const r = (2 * n) / (length - 1) - 1;
+        taps[n] = 2 * cutoff * sinc * besselI0(KAISER_BETA * Math.sqrt(1 - r * r)) / besselI0(KAISER_BETA);
+    }
+    return taps;
 }
 
-// Convert Float32 PCM audio to Int16 PCM (required for WebSocket transmission)
-function convertFloat32ToInt16(buffer) {
-    let int16Array = new Int16Array(buffer.length);
-    for (let i = 0; i < buffer.length; i++) {
-        int16Array[i] = Math.max(-32768, Math.min(32767, buffer[i] * 32768));
+// Modified Bessel function of the first kind, order 0 (for the Kaiser window)
+function besselI0(x) {
+    let sum = 1;
+    let term = 1;
+    for (let k = 1; k < 32; k++) {
+        term *= (x / (2 * k)) ** 2;
+        sum += term;
     }
-    return int16Array.buffer;
+    return sum;
+}
+
+// Convert a Float32 PCM sample to Int16 PCM (required for WebSocket transmission)
+function convertFloat32ToInt16(sample) {
+    return Math.max(-32768, Math.min(32767, sample * 32768));
 }
 
-registerProcessor("audio-processor", AudioProcessor);
\ No newline at end of file
+registerProcessor("audio-processor", AudioProcessor);
@@ -1,5 +1,11 @@
 import React, { useState, useRef, useEffect } from "react";
 
+// Microphone audio is sent in frames of this many ms (20-100), not per 128-sample quantum
+const CAPTURE_FRAME_MS = 100;
+// What the server's recognizer takes; a device rate that is a multiple of it is decimated
+// in the worklet, so the server does not resample it
+const RECOGNIZER_RATE = 16000;
+
 const Home = () => {
   const [input, setInput] = useState("");
   const [file, setFile] = useState(null);
@@ -19,6 +25,13 @@ const Home = () => {
   const ws = useRef(null);
   const audioContextRef = useRef(null);
   const workletNodeRef = useRef(null);
+  const audioQueueRef = useRef([]);
+  const audioPlayingRef = useRef(false);
+  const documentIdRef = useRef("");
+  const pendingAudioRef = useRef(null);
+  const seqRef = useRef(0); // Sequence number of the last message sent to the server
+  const lastTurnRef = useRef(0); // Id of the last turn the server started sending
+  const interruptedTurnRef = useRef(0); // Segments of this turn and earlier ones are dropped
   const [isTaskLoading, setIsTaskLoading] = useState(false); // New state for task loader
 
   // Initialize messages
@@ -102,6 +115,7 @@ const Home = () => {
 
       const result = await response.json();
       if (!response.ok) throw new Error(result.detail);
+      documentIdRef.current = result.document_id || "";
 
       setMessages((prev) => [
         ...prev,
@@ -139,6 +153,72 @@ const Home = () => {
     }
   };
 
+  // Send a typed, numbered message to the server (see src/protocol.py)
+  const sendMessage = (type, fields = {}) => {
+    if (ws.current && ws.current.readyState === WebSocket.OPEN) {
+      seqRef.current += 1;
+      ws.current.send(JSON.stringify({ type, seq: seqRef.current, ...fields }));
+    }
+  };
+
+  // Send acknowledgment to server once a turn has finished playing
+  const sendAck = (turn) => sendMessage("ack", { turn });
+
+  // Close the microphone once the server stops listening
+  const closeMicrophone = async () => {
+    if (audioContextRef.current) {
+      await audioContextRef.current.close();
+      audioContextRef.current = null;
+    }
+    if (workletNodeRef.current) {
+      workletNodeRef.current.disconnect();
+      workletNodeRef.current = null;
+    }
+    setIsRecording(false);
+    console.log("Microphone closed.");
+  };
+
+  // Play queued audio segments in order
+  const playNextSegment = () => {
+    const next = audioQueueRef.current.shift();
+    if (!next) {
+      audioPlayingRef.current = false;
+      setIsAudioPlaying(false);
+      return;
+    }
+
+    audioPlayingRef.current = true;
+    setIsAudioPlaying(true);
+    const audio = new Audio(next.url);
+    setCurrentAudio(audio);
+
+    const onDone = () => {
+      if (next.last) {
+        console.log("Audio playback completed.");
+        sendAck(next.turn);
+      }
+      playNextSegment();
+    };
+
+    audio.onended = onDone;
+    audio.play().catch((error) => {
+      console.error("Error playing audio:", error);
+      // Still continue (and acknowledge) if audio fails
+      onDone();
+    });
+  };
+
+  const enqueueAudio = (url, last, turn) => {
+    if (!url) {
+      if (last) sendAck(turn);
+      return;
+    }
+    audioQueueRef.current.push({ url, last, turn });
+    if (!audioPlayingRef.current) {
+      playNextSegment();
+    }
+  };
+
   // Start the podcast conversation
   const startPodcast = () => {
     if (isPodcastActive) {
@@ -153,7 +233,13 @@ const Home = () => {
 
     // Initialize WebSocket if not already initialized
     if (!ws.current || ws.current.readyState === WebSocket.CLOSED) {
-      ws.current = new WebSocket("ws://127.0.0.1:8000/ws");
+      ws.current = new WebSocket(
+        `ws://127.0.0.1:8000/ws?document_id=${encodeURIComponent(documentIdRef.current)}`
+      );
+      ws.current.binaryType = "arraybuffer";
+      seqRef.current = 0;
+      lastTurnRef.current = 0;
+      interruptedTurnRef.current = 0;
 
       ws.current.onopen = () => {
         console.log("Podcast WebSocket connection established");
@@ -172,113 +258,79 @@ const Home = () => {
 
       ws.current.onmessage = async (event) => {
         try {
-          const data = JSON.parse(event.data);
+          let data;
+          if (event.data instanceof ArrayBuffer) {
+            // Audio of a turn the user talked over, still in flight
+            if (pendingAudioRef.current?.turn <= interruptedTurnRef.current) {
+              pendingAudioRef.current = null;
+              return;
+            }
+            // Audio sent as a binary frame belongs to the message just before it
+            const blob = new Blob([event.data], {
+              type: pendingAudioRef.current?.format || "audio/mpeg",
+            });
+            data = { ...pendingAudioRef.current, audio: URL.createObjectURL(blob) };
+            pendingAudioRef.current = null;
+          } else {
+            data = JSON.parse(event.data);
+            if (data.audio === "binary") {
+              pendingAudioRef.current = data;
+              return;
+            }
+          }
           console.log("Received WebSocket message:", data);
 
           // Handle incoming podcast message
-          if (data.speaker && data.text) {
-            // Add message to conversation
-            setMessages((prev) => [
-              ...prev,
-              {
-                type: "ai",
-                speaker: data.speaker,
-                content: data.text.replace("[end_of_query]", ""),
-                time: new Date().toLocaleTimeString(),
-                audioUrl: data.audio,
-              },
-            ]);
+          if (data.type === "audio_segment") {
+            // The user talked over this turn (barge-in), the server stops sending it
+            if (data.turn <= interruptedTurnRef.current) return;
+            lastTurnRef.current = data.turn;
+
+            // Streamed turns arrive as several audio segments; show the text once
+            if (!data.segment) {
+              // The reply (or the next podcast turn) has arrived
+              setIsLoading(false);
+              setMessages((prev) => [
+                ...prev,
+                {
+                  type: "ai",
+                  speaker: data.speaker,
+                  content: data.text.replace("[end_of_query]", ""),
+                  time: new Date().toLocaleTimeString(),
+                  audioUrl: data.audio,
+                },
+              ]);
+            }
 
             // Update conversation stage
             if (data.stage) {
               setConversationStage(data.stage);
             }
 
-            // Play audio
-            if (data.audio) {
-              // Stop any currently playing audio
-              if (currentAudio) {
-                currentAudio.pause();
-                currentAudio.currentTime = 0;
-              }
-
-              const audio = new Audio(data.audio);
-              setIsAudioPlaying(true);
-              setCurrentAudio(audio);
-
-              audio.onended = () => {
-                setIsAudioPlaying(false);
-                console.log("Audio playback completed.");
-
-                // Send acknowledgment to server
-                if (ws.current && ws.current.readyState === WebSocket.OPEN) {
-                  ws.current.send(JSON.stringify({ message: "Chunks" }));
-                }
-              };
-
-              audio.play().catch((error) => {
-                console.error("Error playing audio:", error);
-                // Still send acknowledgment if audio fails
-                if (ws.current && ws.current.readyState === WebSocket.OPEN) {
-                  ws.current.send(JSON.stringify({ message: "Chunks" }));
-                }
-              });
-            }
+            // Queue audio, the last segment of a turn acknowledges the server
+            const isLastSegment = data.segment >= data.segments - 1;
+            enqueueAudio(data.audio, isLastSegment, data.turn);
           }
 
-          // Handle recording-related messages
-          if (data.Final) {
-            setTranscript((prev) => prev + " " + data.Final);
-            console.log("Final transcript received:", data.Final);
-
-            // Close the microphone
-            if (audioContextRef.current) {
-              await audioContextRef.current.close();
-              audioContextRef.current = null;
-            }
-            if (workletNodeRef.current) {
-              workletNodeRef.current.disconnect();
-              workletNodeRef.current = null;
-            }
-            setIsRecording(false); // Stop recording state
-            console.log("Microphone closed.");
-            setIsLoading(true);
-            // Send "Yes" response to the server
-            const payload = { message: "Yes", input: data.Final };
-            console.log("Sending to server:", payload);
-            if (ws.current && ws.current.readyState === WebSocket.OPEN) {
-              ws.current.send(JSON.stringify(payload));
+          // The server stopped listening: end of speech, final transcript or stop_speech
+          if (data.type === "speech_ended") {
+            await closeMicrophone();
+            // Only these end with a transcript the server answers; otherwise nothing is coming
+            if (!["speech", "transcribed", "stopped"].includes(data.reason)) {
+              setIsLoading(false);
             }
+          }
 
-            if (ws.current && ws.current.readyState === WebSocket.OPEN) {
-              ws.current.send(JSON.stringify(payload));
-            }
-            console.log("send twice to server:", payload);
-            // Wait for server confirmation
-            const response = await new Promise((resolve) => {
-              const listener = (event) => {
-                try {
-                  const responseData = JSON.parse(event.data);
-                  if (responseData.message === "Yes") {
-                    resolve(responseData);
-                  }
-                } catch (error) {
-                  console.error("Error processing server response:", error);
-                } finally {
-                  ws.current.removeEventListener("message", listener);
-                  setIsLoading(false);
-                }
-              };
-              ws.current.addEventListener("message", listener);
-            });
-
-            console.log("Server response:", response);
+          // The server answers the final transcript itself, no confirmation needed
+          if (data.type === "transcript" && data.final) {
+            setTranscript((prev) => prev + " " + data.text);
+            console.log("Final transcript received:", data.text);
+            setIsLoading(true);
+          }
 
-            // Call endpoint_user if server confirms
-            if (response.message === "Yes") {
-              await endpoint_user(user_id, response.input, ws.current);
-              console.log("Loop ended");
-            }
+          if (data.type === "error") {
+            console.error("Server error:", data.message);
+            setIsLoading(false);
           }
         } catch (error) {
           console.error("Error processing WebSocket message:", error);
@@ -304,7 +356,10 @@ const Home = () => {
   const startRecording = async () => {
     if (isRecording) return;
 
-    // Stop any currently playing audio
+    // Stop any currently playing audio and drop queued segments, and those still to come
+    interruptedTurnRef.current = lastTurnRef.current;
+    audioQueueRef.current = [];
+    audioPlayingRef.current = false;
     if (currentAudio) {
       currentAudio.pause();
       currentAudio.currentTime = 0;
@@ -320,15 +375,22 @@ const Home = () => {
       return;
     }
 
-    // Send "chunks" message to the server
-    if (ws.current.readyState === WebSocket.OPEN) {
-      ws.current.send(JSON.stringify({ message: "chunks" }));
-    }
-
     // Get Microphone Input
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-      audioContextRef.current = new AudioContext({ sampleRate: 16000 });
+      // Native rate of the device: 48 kHz is decimated to 16 kHz here, other rates are
+      // resampled by the server
+      audioContextRef.current = new AudioContext();
+      const nativeRate = audioContextRef.current.sampleRate;
+      const decimation = nativeRate % RECOGNIZER_RATE === 0 ? nativeRate / RECOGNIZER_RATE : 1;
+
+      // Tell the server speech starts, and the format of the audio frames that follow
+      sendMessage("start_speech", {
+        sample_rate: nativeRate / decimation,
+        channels: 1,
+        format: "s16le",
+      });
+
       const source = audioContextRef.current.createMediaStreamSource(stream);
 
       // Load Audio Worklet
@@ -337,7 +399,8 @@ const Home = () => {
       // Create Worklet Node
       workletNodeRef.current = new AudioWorkletNode(
         audioContextRef.current,
-        "audio-processor"
+        "audio-processor",
+        { processorOptions: { frameMs: CAPTURE_FRAME_MS, decimation } }
       );
       source.connect(workletNodeRef.current);
       workletNodeRef.current.connect(audioContextRef.current.destination);
@@ -355,10 +418,10 @@ const Home = () => {
     }
   };
 
-  const stopRecording = () => {
-    setIsRecording(false);
-    workletNodeRef.current?.disconnect();
-    audioContextRef.current?.close();
+  const stopRecording = async () => {
+    // The server transcribes what was sent so far and answers with speech_ended
+    sendMessage("stop_speech");
+    await closeMicrophone();
     console.log("🎤 Recording Stopped");
   };
 
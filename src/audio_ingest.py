@@ -0,0 +1,152 @@
+import os
+from math import gcd
+import numpy as np
+
+# What Google STT is fed: 16-bit mono PCM at this rate, in packets of STT_PACKET_MS
+RECOGNIZER_RATE = 16000
+STT_PACKET_MS = int(os.getenv("STT_PACKET_MS", 100))
+
+# Sample formats a client may announce when it starts streaming
+SAMPLE_FORMATS = {"s16le": np.dtype("<i2"), "f32le": np.dtype("<f4")}
+
+RESAMPLER_ZERO_CROSSINGS = 16  # Filter half-length, in zero crossings of the lowest cutoff
+RESAMPLER_BETA = 8.0  # Kaiser window, ~80 dB stopband
+
+
+class Resampler:
+    """Streaming polyphase resampler for 1-D float signals, by the rational factor up/down.
+
+    Only the output samples are computed: output n reads input around n * down / up through
+    the filter phase (n * down) % up. Chunks may have any size; the filter history is kept
+    between calls, so the concatenated output equals resampling the whole signal at once.
+    """
+
+    def __init__(self, input_rate, output_rate):
+        divisor = gcd(input_rate, output_rate)
+        self.up = output_rate // divisor
+        self.down = input_rate // divisor
+
+        # Low-pass at the lower of the two Nyquist rates, designed at the upsampled rate
+        cutoff = 0.5 / max(self.up, self.down)
+        taps_per_phase = 2 * int(np.ceil(RESAMPLER_ZERO_CROSSINGS * max(self.up, self.down) / self.up))
+        length = taps_per_phase * self.up
+        center = (length - 1) / 2
+        n = np.arange(length)
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * (n - center)) * np.kaiser(length, RESAMPLER_BETA) * self.up
+
+        # phases[p, j] multiplies input sample (base - j) for outputs of phase p
+        self.phases = prototype.reshape(taps_per_phase, self.up).T.copy()
+        self.taps = taps_per_phase
+        self.delay = center / self.up  # Input samples of filter delay, trimmed from the output
+
+        self.buffer = np.zeros(self.taps - 1)  # History preceding buffer_start
+        self.buffer_start = -(self.taps - 1)  # Absolute index of buffer[0]
+        self.produced = 0  # Output samples emitted so far (delay included)
+        self.skip = int(round(self.delay * self.up / self.down))  # Leading outputs that are filter delay
+
+    def process(self, samples):
+        if self.up == self.down:
+            return samples.astype(np.float64, copy=False)
+
+        self.buffer = np.concatenate([self.buffer, samples])
+        last = self.buffer_start + len(self.buffer) - 1  # Absolute index of the newest input
+
+        # Every output whose newest input sample has arrived
+        end = ((last + 1) * self.up + self.down - 1) // self.down
+        outputs = np.arange(self.produced, end)
+        if outputs.size == 0:
+            return np.zeros(0)
+
+        positions = outputs * self.down
+        bases = positions // self.up - self.buffer_start
+        if self.up == 1:
+            # Integer decimation (48 kHz to 16 kHz): one phase, filter everything and keep every down-th
+            filtered = np.convolve(self.buffer, self.phases[0], mode="valid")
+            result = filtered[bases[0] - (self.taps - 1)::self.down][:outputs.size]
+        else:
+            windows = np.lib.stride_tricks.sliding_window_view(self.buffer, self.taps)[:, ::-1]
+            result = np.einsum("ij,ij->i", windows[bases - (self.taps - 1)], self.phases[positions % self.up])
+
+        self.produced = end
+        keep_from = (end * self.down) // self.up - (self.taps - 1) - self.buffer_start
+        if keep_from > 0:
+            self.buffer = self.buffer[keep_from:]
+            self.buffer_start += keep_from
+
+        if self.skip:
+            dropped = min(self.skip, result.size)
+            result = result[dropped:]
+            self.skip -= dropped
+        return result
+
+
+class AudioIngest:
+    """Turns whatever the client streams into fixed packets of RECOGNIZER_RATE 16-bit mono PCM.
+
+    The client announces its format when it starts a stream (sample rate, channels, sample
+    format); feed() takes chunks of any size and returns the whole packets now available.
+    """
+
+    def __init__(self, sample_rate=RECOGNIZER_RATE, channels=1, sample_format="s16le",
+                 output_rate=RECOGNIZER_RATE, packet_ms=STT_PACKET_MS):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format {sample_format!r}, expected one of {', '.join(SAMPLE_FORMATS)}")
+        if not 8000 <= sample_rate <= 192000 or channels < 1:
+            raise ValueError(f"Unsupported stream: {sample_rate} Hz, {channels} channels")
+
+        self.dtype = SAMPLE_FORMATS[sample_format]
+        self.channels = channels
+        self.frame_bytes = self.dtype.itemsize * channels
+        self.resampler = Resampler(sample_rate, output_rate) if sample_rate != output_rate else None
+        self.packet_bytes = output_rate * packet_ms // 1000 * 2
+        self.pending = b""  # Input bytes short of a whole sample frame
+        self.output = bytearray()  # Converted audio short of a whole packet
+        self.input_bytes = 0
+
+    @classmethod
+    def from_message(cls, message):
+        """Build from the client's stream start message, falling back to 16 kHz mono int16.
+
+        Raises ValueError for fields of the wrong type, as for unsupported values.
+        """
+        sample_rate = message.get("sample_rate", RECOGNIZER_RATE)
+        channels = message.get("channels", 1)
+        sample_format = message.get("format", "s16le")
+        for name, value in (("sample_rate", sample_rate), ("channels", channels)):
+            # bool is an int subclass, but true is not a sample rate
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ValueError(f"{name} must be an integer, got {value!r}")
+        if not isinstance(sample_format, str):
+            raise ValueError(f"format must be a string, got {sample_format!r}")
+        return cls(sample_rate=sample_rate, channels=channels, sample_format=sample_format)
+
+    def convert(self, data):
+        samples = np.frombuffer(data, dtype=self.dtype)
+        if self.dtype.kind == "f":
+            samples = samples * 32768.0
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        if self.resampler is not None:
+            samples = self.resampler.process(samples.astype(np.float64, copy=False))
+        elif self.dtype.kind == "i" and self.channels == 1:
+            return samples.astype("<i2", copy=False).tobytes()
+        return np.clip(np.rint(samples), -32768, 32767).astype("<i2").tobytes()
+
+    def feed(self, chunk):
+        self.input_bytes += len(chunk)
+        data = self.pending + chunk
+        whole = len(data) - len(data) % self.frame_bytes
+        self.pending = data[whole:]
+        if whole:
+            self.output += self.convert(data[:whole])
+        return self.packets()
+
+    def packets(self, flush=False):
+        size = len(self.output) if flush else len(self.output) - len(self.output) % self.packet_bytes
+        packets = [bytes(self.output[offset:offset + self.packet_bytes]) for offset in range(0, size, self.packet_bytes)]
+        del self.output[:size]
+        return packets
+
+    def flush(self):
+        """The remaining partial packet, at the end of the stream."""
+        return self.packets(flush=True)
@@ -0,0 +1,97 @@
+import os
+import threading
+from dotenv import load_dotenv
+from .executors import llm_limiter
+
+load_dotenv()
+
+LOCATION = "us"
+
+# "google" for the live services, "fake" for the deterministic local stand-ins in fake_backends.py
+BACKEND = os.getenv("BACKEND", "google")
+
+
+def _genai_client():
+    from google import genai
+    return genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+
+def _tts_client():
+    from google.cloud import texttospeech
+    return texttospeech.TextToSpeechClient()
+
+
+def _speech_client():
+    from google.cloud import speech
+    return speech.SpeechClient()
+
+
+def _documentai_client():
+    from google.api_core.client_options import ClientOptions
+    from google.cloud import documentai
+    return documentai.DocumentProcessorServiceClient(
+        client_options=ClientOptions(api_endpoint=f"{LOCATION}-documentai.googleapis.com")
+    )
+
+
+class ClientPool:
+    """Lazily created, round-robin pool of clients for one service."""
+
+    def __init__(self, factory, size=1):
+        self.factory = factory
+        self.size = max(1, size)
+        self.clients = []
+        self.next_index = 0
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if len(self.clients) < self.size:
+                client = self.factory()
+                self.clients.append(client)
+                return client
+            client = self.clients[self.next_index]
+            self.next_index = (self.next_index + 1) % self.size
+            return client
+
+
+# Service name -> (factory, default pool size). Pool sizes can be overridden with e.g. TTS_CLIENT_POOL_SIZE=4
+CLIENT_FACTORIES = {
+    "genai": (_genai_client, 1),
+    "tts": (_tts_client, 2),
+    "speech": (_speech_client, 1),
+    "documentai": (_documentai_client, 1),
+}
+
+if BACKEND == "fake":
+    from .fake_backends import FAKE_CLIENT_FACTORIES
+    CLIENT_FACTORIES.update(FAKE_CLIENT_FACTORIES)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def register_client(name, factory, pool_size=1):
+    """Register (or replace) the factory used for a service and drop any clients already built."""
+    with _pools_lock:
+        CLIENT_FACTORIES[name] = (factory, pool_size)
+        _pools.pop(name, None)
+
+
+def get_client(name):
+    """Return a shared client for a service, creating it on first use."""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                factory, default_size = CLIENT_FACTORIES[name]
+                size = int(os.getenv(f"{name.upper()}_CLIENT_POOL_SIZE", default_size))
+                pool = _pools[name] = ClientPool(factory, size)
+    return pool.get()
+
+
+async def generate_content_async(**kwargs):
+    """Native asyncio Gemini call through the shared client, admitted by the LLM limiter (see executors.py)."""
+    async with llm_limiter:
+        return await get_client("genai").aio.models.generate_content(**kwargs)
@@ -1,48 +1,162 @@
 import redis
+import redis.asyncio
 import json
+from collections import deque
 from dotenv import load_dotenv
 import os
+from .clients import BACKEND
 
 load_dotenv()
 
+REDIS_HOST = 'redis-19131.c62.us-east-1-4.ec2.redns.redis-cloud.com'
+REDIS_PORT = 19131
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+
 # Connect to Redis
 redis_client = redis.Redis(
-    host='redis-19131.c62.us-east-1-4.ec2.redns.redis-cloud.com',
-    port=19131,
+    host=REDIS_HOST,
+    port=REDIS_PORT,
     decode_responses=True,
     username="default",
     password=os.getenv("REDIS_DB_PASSWORD")
 )
 
-def store_chat_history(user_id, agent_name="Agent", agent_response="", agent_conversation_stage=""):
-    """Store last 30 conversations in Redis for a given user."""
-    key = f"chat_history:{user_id}"
+# Pooled asyncio client used from the websocket handlers
+async_redis_client = redis.asyncio.Redis(
+    connection_pool=redis.asyncio.ConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        decode_responses=True,
+        username="default",
+        password=os.getenv("REDIS_DB_PASSWORD"),
+        max_connections=REDIS_MAX_CONNECTIONS,
+    )
+)
 
-    conversation_entry = json.dumps({
+if BACKEND == "fake":
+    from .fake_backends import MemoryRedis, AsyncMemoryRedis
+    redis_client = MemoryRedis()
+    async_redis_client = AsyncMemoryRedis(redis_client)
+
+HISTORY_LENGTH = 30  # Messages kept per user
+
+def encode_chat_entry(agent_name="Agent", agent_response="", agent_conversation_stage=""):
+    return json.dumps({
         "Agent": agent_name,
         "Response": agent_response,
         "Stage": agent_conversation_stage
     })
 
+
+def store_chat_history(user_id, agent_name="Agent", agent_response="", agent_conversation_stage=""):
+    """Store last 30 conversations in Redis for a given user."""
+    key = f"chat_history:{user_id}"
+
+    conversation_entry = encode_chat_entry(agent_name, agent_response, agent_conversation_stage)
+
     redis_client.lpush(key, conversation_entry)
-    redis_client.ltrim(key, 0, 30)  # Keep only last 30 messages
+    redis_client.ltrim(key, 0, HISTORY_LENGTH)  # Keep only last 30 messages
     print("Added to Database")
 
-def get_chat_history(user_id):
-    """Retrieve the last 10 messages of a user as a single formatted string."""
+
+async def store_chat_entries_async(user_id, entries):
+    """Append (agent_name, agent_response, stage) entries in order and trim, in one MULTI round trip."""
+    if not entries:
+        return
+    key = f"chat_history:{user_id}"
+
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.lpush(key, *(encode_chat_entry(*entry) for entry in entries))
+        pipe.ltrim(key, 0, HISTORY_LENGTH)  # Keep only last 30 messages
+        await pipe.execute()
+
+HISTORY_WINDOW = 11  # Entries included in the prompt history
+
+
+def format_chat_entry(agent_name, agent_response, agent_conversation_stage):
+    """Format one conversation entry the way it appears in the prompt history."""
+    return f"{agent_name}: {agent_response} (Stage: {agent_conversation_stage})"
+
+
+def get_chat_history_lines(user_id):
+    """Retrieve the last messages of a user as formatted lines, oldest first."""
     key = f"chat_history:{user_id}"
-    history = redis_client.lrange(key, 0, 10)  
+    history = redis_client.lrange(key, 0, HISTORY_WINDOW - 1)  
 
     # Convert JSON to dictionary and format
     messages = [json.loads(entry) for entry in history]
     messages.reverse()  # Reverse to show in correct order
 
-    # Format messages into a readable string
-    formatted_history = "\n".join(
-        f"{msg['Agent']}: {msg['Response']} (Stage: {msg['Stage']})" for msg in messages
-    )
+    return [format_chat_entry(msg['Agent'], msg['Response'], msg['Stage']) for msg in messages]
+
+
+def get_chat_history(user_id):
+    """Retrieve the last 10 messages of a user as a single formatted string."""
+    return "\n".join(get_chat_history_lines(user_id))
+
+
+async def get_chat_history_lines_async(user_id):
+    key = f"chat_history:{user_id}"
+    history = await async_redis_client.lrange(key, 0, HISTORY_WINDOW - 1)
+
+    messages = [json.loads(entry) for entry in reversed(history)]
+    return [format_chat_entry(msg['Agent'], msg['Response'], msg['Stage']) for msg in messages]
+
+
+class SessionHistory:
+    """In-process mirror of a user's recent history that writes through to Redis.
+
+    The formatted prompt history is maintained incrementally, so Redis is only
+    read once per session (cold start or reconnect).
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.lines = deque(maxlen=HISTORY_WINDOW)
+        self.text = ""
+        self.loaded = False
+
+    async def load(self):
+        """(Re)load the window from Redis."""
+        self.lines.clear()
+        self.text = ""
+        self.add_lines(await get_chat_history_lines_async(self.user_id))
+        self.loaded = True
+
+    async def get(self):
+        """Return the formatted history, same as get_chat_history."""
+        if not self.loaded:
+            await self.load()
+        return self.text
+
+    async def store(self, *entries):
+        """Append (agent_name, agent_response, stage) entries to Redis in one round trip, then to the window."""
+        if not self.loaded:
+            await self.load()
+        await store_chat_entries_async(self.user_id, entries)
+        self.add_lines(format_chat_entry(*entry) for entry in entries)
+
+    def add_lines(self, lines):
+        for line in lines:
+            if len(self.lines) == self.lines.maxlen:
+                oldest = self.lines.popleft()
+                self.text = self.text[len(oldest) + 1:]
+            self.lines.append(line)
+            self.text = f"{self.text}\n{line}" if len(self.lines) > 1 else line
+
+
+session_histories = {}
+
+
+def get_session_history(user_id):
+    """Return the history mirror for a session, creating it on first use."""
+    if user_id not in session_histories:
+        session_histories[user_id] = SessionHistory(user_id)
+    return session_histories[user_id]
+
 
-    return formatted_history
+def drop_session_history(user_id):
+    session_histories.pop(user_id, None)
 
 if __name__ == "__main__":
 
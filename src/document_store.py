@@ -0,0 +1,40 @@
+import os
+from collections import OrderedDict
+from .conv_history import async_redis_client
+
+DOCUMENT_TTL_SECONDS = int(os.getenv("DOCUMENT_TTL_SECONDS", 7 * 24 * 3600))
+DOCUMENT_LRU_SIZE = int(os.getenv("DOCUMENT_LRU_SIZE", 128))  # Summaries kept in process
+
+
+class DocumentStore:
+    """Document id -> summary, shared between worker processes through Redis with a hot in-process LRU."""
+
+    def __init__(self, redis_client, ttl_seconds=DOCUMENT_TTL_SECONDS, max_local=DOCUMENT_LRU_SIZE):
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.max_local = max_local
+        self.local = OrderedDict()
+
+    def remember(self, document_id, summary):
+        self.local[document_id] = summary
+        self.local.move_to_end(document_id)
+        while len(self.local) > self.max_local:
+            self.local.popitem(last=False)
+
+    async def put(self, document_id, summary):
+        await self.redis.set(f"document:{document_id}", summary, ex=self.ttl_seconds)
+        self.remember(document_id, summary)
+
+    async def get(self, document_id):
+        """Return the summary of a document, or None if it is unknown or expired."""
+        if document_id in self.local:
+            self.local.move_to_end(document_id)
+            return self.local[document_id]
+
+        summary = await self.redis.get(f"document:{document_id}")
+        if summary is not None:
+            self.remember(document_id, summary)
+        return summary
+
+
+document_store = DocumentStore(async_redis_client)
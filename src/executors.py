@@ -0,0 +1,177 @@
+"""Separate, bounded pools per workload, so one kind of work cannot starve another.
+
+Long STT streams hold a thread for a whole utterance; on a shared pool they used to block
+TTS synthesis. Each workload now has its own threads and a bounded queue: when the queue
+is full new work is rejected at once with ExecutorBusy, and work that waited longer than
+the queue timeout is dropped instead of run late.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+WAIT_SAMPLES = 1024  # Queue waits kept per pool for the percentiles in stats()
+
+
+class ExecutorBusy(Exception):
+    """Raised when a pool's queue is full or work waited past its deadline."""
+
+
+def wait_stats(waits):
+    ordered = sorted(waits)
+    return {
+        "wait_ms_p50": ordered[len(ordered) // 2] if ordered else 0.0,
+        "wait_ms_p95": ordered[int(len(ordered) * 0.95)] if ordered else 0.0,
+        "wait_ms_max": ordered[-1] if ordered else 0.0,
+    }
+
+
+class BoundedExecutor:
+    """Thread pool with admission control: max_workers running, at most max_queue waiting."""
+
+    def __init__(self, name, max_workers, max_queue, queue_timeout=0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout  # Seconds, 0 waits as long as it takes
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.lock = threading.Lock()
+        self.pending = 0  # Queued and running
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+
+    def submit(self, fn, *args):
+        """Queue fn(*args), returning a concurrent.futures.Future. Raises ExecutorBusy when full."""
+        with self.lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorBusy(f"{self.name} pool is busy")
+            self.pending += 1
+
+        queued_at = time.perf_counter()
+
+        def task():
+            waited = time.perf_counter() - queued_at
+            with self.lock:
+                self.waits.append(waited * 1000)
+                self.running += 1
+            try:
+                if self.queue_timeout and waited > self.queue_timeout:
+                    with self.lock:
+                        self.expired += 1
+                    raise ExecutorBusy(f"{self.name} work waited {waited:.1f}s in the queue")
+                return fn(*args)
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self.pending -= 1
+                    self.completed += 1
+
+        future = self.executor.submit(task)
+        future.add_done_callback(self.forget_cancelled)
+        return future
+
+    def forget_cancelled(self, future):
+        # Work cancelled before it started never runs task(), free its queue slot here
+        if future.cancelled():
+            with self.lock:
+                self.pending -= 1
+
+    def run(self, fn, *args):
+        """asyncio counterpart of submit. Rejection is reported through the returned future."""
+        try:
+            return asyncio.wrap_future(self.submit(fn, *args))
+        except ExecutorBusy as e:
+            future = asyncio.get_running_loop().create_future()
+            future.set_exception(e)
+            return future
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.max_workers,
+                "running": self.running,
+                "queue_depth": self.pending - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                **wait_stats(self.waits),
+            }
+
+
+class AdmissionLimiter:
+    """Bounds concurrent asyncio work (e.g. LLM calls) the same way: limited waiters with a deadline."""
+
+    def __init__(self, name, concurrency, max_waiting, queue_timeout=0):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+
+    async def __aenter__(self):
+        if self.semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise ExecutorBusy(f"{self.name} is busy")
+
+        self.waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout or None)
+        except asyncio.TimeoutError:
+            self.expired += 1
+            raise ExecutorBusy(f"{self.name} waited {self.queue_timeout}s for a slot") from None
+        finally:
+            self.waiting -= 1
+        self.waits.append((time.perf_counter() - queued_at) * 1000)
+        self.running += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.running -= 1
+        self.completed += 1
+        self.semaphore.release()
+
+    def stats(self):
+        return {
+            "workers": self.concurrency,
+            "running": self.running,
+            "queue_depth": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            **wait_stats(self.waits),
+        }
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+# Sizes per workload: {NAME}_WORKERS threads (or concurrent calls), {NAME}_QUEUE waiting,
+# {NAME}_QUEUE_TIMEOUT seconds before queued work is dropped
+tts_executor = BoundedExecutor("tts", env_int("TTS_WORKERS", 16), env_int("TTS_QUEUE", 128), env_int("TTS_QUEUE_TIMEOUT", 10))
+# A stream holds its thread for the whole utterance, so do not queue behind one
+stt_executor = BoundedExecutor("stt", env_int("STT_WORKERS", 32), env_int("STT_QUEUE", 0))
+document_executor = BoundedExecutor("document", env_int("DOCUMENT_WORKERS", 4), env_int("DOCUMENT_QUEUE", 16), env_int("DOCUMENT_QUEUE_TIMEOUT", 120))
+# OCR runs and Gemini summary calls a document fans out into, from the document pool's threads
+chunk_executor = BoundedExecutor("chunk", env_int("CHUNK_WORKERS", 8), env_int("CHUNK_QUEUE", 256), env_int("CHUNK_QUEUE_TIMEOUT", 120))
+# Session teardown (releasing its audio); no deadline, skipped cleanup would leak holds
+cleanup_executor = BoundedExecutor("cleanup", env_int("CLEANUP_WORKERS", 2), env_int("CLEANUP_QUEUE", 1024))
+llm_limiter = AdmissionLimiter("llm", env_int("LLM_MAX_CONCURRENCY", 64), env_int("LLM_QUEUE", 256), env_int("LLM_QUEUE_TIMEOUT", 30))
+
+
+def executor_stats():
+    pools = (tts_executor, stt_executor, document_executor, chunk_executor, cleanup_executor, llm_limiter)
+    return {pool.name: pool.stats() for pool in pools}
@@ -0,0 +1,282 @@
+"""Deterministic local stand-ins for Gemini, TTS, STT, Document AI and Redis.
+
+Enabled with BACKEND=fake. Every fake answers from a hash of its input, so
+runs are repeatable, and sleeps for a configurable latency so the server's
+own overhead can be measured offline (see benchmarks/load_test.py).
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from types import SimpleNamespace
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", 300))
+FAKE_LLM_WORDS = int(os.getenv("FAKE_LLM_WORDS", 40))
+FAKE_TTS_LATENCY_MS = float(os.getenv("FAKE_TTS_LATENCY_MS", 150))
+FAKE_TTS_BYTES = int(os.getenv("FAKE_TTS_BYTES", 24000))
+FAKE_STT_LATENCY_MS = float(os.getenv("FAKE_STT_LATENCY_MS", 50))
+FAKE_OCR_LATENCY_MS = float(os.getenv("FAKE_OCR_LATENCY_MS", 800))
+FAKE_REDIS_LATENCY_MS = float(os.getenv("FAKE_REDIS_LATENCY_MS", 1))
+
+WORDS = ("haan", "toh", "AI", "data", "model", "future", "dekho", "interesting", "system", "security",
+         "code", "hmm", "bilkul", "example", "research", "industry", "sahi", "baat", "learning", "impact")
+
+
+def seeded(*parts):
+    return random.Random(hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).digest())
+
+
+def fake_sentences(rng, words):
+    """Text of the given length, split into sentences of 6-12 words."""
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(6, 12))
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+class FakeModels:
+    def __init__(self, latency_ms=FAKE_LLM_LATENCY_MS, words=FAKE_LLM_WORDS):
+        self.latency_ms = latency_ms
+        self.words = words
+
+    def respond(self, model, contents, config=None):
+        config = config or {}
+        rng = seeded(model, contents, config.get("system_instruction"), config.get("cached_content"))
+        schema = config.get("response_schema")
+        if schema is None:
+            return SimpleNamespace(text=fake_sentences(rng, self.words))
+
+        fields = {}
+        for name, field in schema.model_fields.items():
+            fields[name] = rng.randint(1, 9) if field.annotation is int else fake_sentences(rng, self.words)
+        return SimpleNamespace(text=json.dumps(fields))
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(self.latency_ms / 1000)
+        return self.respond(model, contents, config)
+
+
+class FakeAsyncModels(FakeModels):
+    async def generate_content(self, model, contents, config=None):
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self.respond(model, contents, config)
+
+
+class FakeAsyncCaches:
+    async def create(self, model, config=None):
+        await asyncio.sleep(FAKE_LLM_LATENCY_MS / 1000)
+        digest = hashlib.sha256(f"{model}\x1f{(config or {}).get('system_instruction')}".encode("utf-8")).hexdigest()
+        return SimpleNamespace(name=f"cachedContents/{digest[:16]}")
+
+
+class FakeGenaiClient:
+    def __init__(self):
+        self.models = FakeModels()
+        self.aio = SimpleNamespace(models=FakeAsyncModels(), caches=FakeAsyncCaches())
+
+
+class FakeTTSClient:
+    def __init__(self, latency_ms=FAKE_TTS_LATENCY_MS, payload_bytes=FAKE_TTS_BYTES):
+        self.latency_ms = latency_ms
+        self.payload_bytes = payload_bytes
+
+    # Bytes per second of speech relative to MP3 (32 kbps); LINEAR16 is 16-bit PCM at the sample rate
+    ENCODING_RATIO = {"MP3": 1.0, "OGG_OPUS": 0.75}
+    # Container signatures, so format detection sees what the real service returns
+    SIGNATURES = {"MP3": b"ID3", "OGG_OPUS": b"OggS", "LINEAR16": b"RIFF"}
+
+    def synthesize_speech(self, input, voice, audio_config):
+        time.sleep(self.latency_ms / 1000)
+        # Payload scales with text length like real audio does, around payload_bytes for an MP3 sentence
+        ratio = self.ENCODING_RATIO.get(audio_config.audio_encoding.name) or (audio_config.sample_rate_hertz or 24000) * 2 / 4000
+        size = max(1024, int(self.payload_bytes * ratio) * len(input.text) // 80)
+        seed = hashlib.sha256(f"{voice.name}\x1f{input.text}".encode("utf-8")).digest()
+        audio_content = self.SIGNATURES.get(audio_config.audio_encoding.name, b"") + seed * (size // len(seed) + 1)
+        return SimpleNamespace(audio_content=audio_content[:size])
+
+
+class FakeSpeechClient:
+    """Emits an interim result every few requests and a final transcript when the audio ends."""
+
+    def __init__(self, latency_ms=FAKE_STT_LATENCY_MS, interim_every=10):
+        self.latency_ms = latency_ms
+        self.interim_every = interim_every
+
+    def streaming_recognize(self, config, requests):
+        digest = hashlib.sha256()
+        count = 0
+        for request in requests:
+            digest.update(request.audio_content)
+            count += 1
+            if count % self.interim_every == 0:
+                yield self.response(digest.hexdigest(), count // self.interim_every, False)
+
+        time.sleep(self.latency_ms / 1000)
+        yield self.response(digest.hexdigest(), max(1, count // self.interim_every), True)
+
+    @staticmethod
+    def response(seed, words, is_final):
+        transcript = fake_sentences(seeded(seed), min(words, 20))
+        result = SimpleNamespace(alternatives=[SimpleNamespace(transcript=transcript)], is_final=is_final)
+        return SimpleNamespace(results=[result])
+
+
+class FakeDocumentAIClient:
+    def __init__(self, latency_ms=FAKE_OCR_LATENCY_MS, words_per_kb=20):
+        self.latency_ms = latency_ms
+        self.words_per_kb = words_per_kb
+
+    @staticmethod
+    def processor_path(project, location, processor):
+        return f"projects/{project}/locations/{location}/processors/{processor}"
+
+    def process_document(self, request):
+        content = request.raw_document.content
+        time.sleep(self.latency_ms / 1000)
+        words = max(20, len(content) // 1024 * self.words_per_kb)
+        return SimpleNamespace(document=SimpleNamespace(text=fake_sentences(seeded(hashlib.sha256(content).hexdigest()), words)))
+
+
+FAKE_CLIENT_FACTORIES = {
+    "genai": (FakeGenaiClient, 1),
+    "tts": (FakeTTSClient, 1),
+    "speech": (FakeSpeechClient, 1),
+    "documentai": (FakeDocumentAIClient, 1),
+}
+
+
+def _list_range(values, start, end):
+    """Redis LRANGE/LTRIM index semantics: inclusive end, negative indices from the tail."""
+    if end < 0:
+        end += len(values)
+    if start < 0:
+        start = max(0, start + len(values))
+    return values[start:end + 1]
+
+
+class MemoryRedis:
+    """The few list and string commands the app uses, kept in process memory."""
+
+    def __init__(self, latency_ms=FAKE_REDIS_LATENCY_MS):
+        self.latency_ms = latency_ms
+        self.lists = {}
+        self.values = {}  # key -> (value, expiry time or None)
+        self.lock = threading.Lock()
+
+    def run(self, commands):
+        time.sleep(self.latency_ms / 1000)
+        with self.lock:
+            return [getattr(self, f"_{name}")(*args) for name, args in commands]
+
+    def _lpush(self, key, *values):
+        items = self.lists.setdefault(key, [])
+        items[:0] = reversed(values)
+        return len(items)
+
+    def _ltrim(self, key, start, end):
+        self.lists[key] = _list_range(self.lists.get(key, []), start, end)
+        return True
+
+    def _lrange(self, key, start, end):
+        return list(_list_range(self.lists.get(key, []), start, end))
+
+    def _get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and time.time() >= expires_at:
+            del self.values[key]
+            return None
+        return value
+
+    def _set(self, key, value, ex=None):
+        self.values[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def _delete(self, *keys):
+        return sum((self.values.pop(key, None) or self.lists.pop(key, None)) is not None for key in keys)
+
+    def lpush(self, key, *values):
+        return self.run([("lpush", (key, *values))])[0]
+
+    def ltrim(self, key, start, end):
+        return self.run([("ltrim", (key, start, end))])[0]
+
+    def lrange(self, key, start, end):
+        return self.run([("lrange", (key, start, end))])[0]
+
+    def get(self, key):
+        return self.run([("get", (key,))])[0]
+
+    def set(self, key, value, ex=None):
+        return self.run([("set", (key, value, ex))])[0]
+
+    def delete(self, *keys):
+        return self.run([("delete", keys)])[0]
+
+
+class MemoryPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+    def lpush(self, key, *values):
+        self.commands.append(("lpush", (key, *values)))
+
+    def ltrim(self, key, start, end):
+        self.commands.append(("ltrim", (key, start, end)))
+
+    def lrange(self, key, start, end):
+        self.commands.append(("lrange", (key, start, end)))
+
+    def get(self, key):
+        self.commands.append(("get", (key,)))
+
+    def set(self, key, value, ex=None):
+        self.commands.append(("set", (key, value, ex)))
+
+    def delete(self, *keys):
+        self.commands.append(("delete", keys))
+
+    async def execute(self):
+        await asyncio.sleep(self.redis.latency_ms / 1000)
+        with self.redis.lock:
+            results = [getattr(self.redis, f"_{name}")(*args) for name, args in self.commands]
+        self.commands = []
+        return results
+
+
+class AsyncMemoryRedis:
+    """asyncio face of MemoryRedis, sharing its lists."""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self.redis)
+
+    async def run(self, name, *args):
+        pipe = self.pipeline()
+        getattr(pipe, name)(*args)
+        return (await pipe.execute())[0]
+
+    async def lrange(self, key, start, end):
+        return await self.run("lrange", key, start, end)
+
+    async def get(self, key):
+        return await self.run("get", key)
+
+    async def set(self, key, value, ex=None):
+        return await self.run("set", key, value, ex)
+
+    async def delete(self, *keys):
+        return await self.run("delete", *keys)
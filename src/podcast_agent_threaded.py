@@ -1,84 +1,41 @@
-from google import genai
 from dotenv import load_dotenv
-import os
 from pydantic import BaseModel,TypeAdapter, Field
 from typing import List
-from .prompts import STAGES, AGENT_1_PROMPT, AGENT_2_PROMPT, USER_HANDLING_PROMPT, PDF_CONTENT
+from .prompts import AGENT_1_SYSTEM_PROMPT, AGENT_1_TURN_PROMPT, AGENT_2_SYSTEM_PROMPT, AGENT_2_TURN_PROMPT, PDF_CONTENT
 import json
-from .tts import text_to_speech_male, text_to_speech_female, text_to_speech_female_hindi, text_to_speech_male_hindi
+from .tts import synthesize, start_tts
+from .voices import speaker_voice
 import playsound
 import threading
 import queue
 from .conv_history import get_chat_history, store_chat_history
 import uuid
-import asyncio
+from .prompt_cache import get_session_prompt
 
 # from summary import summary_generator
 load_dotenv()
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
 class PodcastAgent:
     class Agent(BaseModel):
         conversation_stage : int = Field(description="Stage of the conversation")
         agent_output : str = Field(description="Current output of agent")
 
-    def podcast_1(self, user_name : str = "", pdf_content : str = "", current_stage : int = "", conversation_history : str = "", user_input : str = ""):
-        prompt_template = AGENT_1_PROMPT.format(
-            conversation_history=conversation_history,
-            current_stage=current_stage,
-            user_input=user_input,
-            pdf_content=pdf_content,
-            stages=STAGES,
-            user_name=user_name)
+    async def podcast_1(self, user_name : str = "", pdf_content : str = "", current_stage : int = "", conversation_history : str = "", user_input : str = ""):
+        # Static instructions, stages and content are rendered and cached once per document
+        prompt = get_session_prompt(AGENT_1_SYSTEM_PROMPT, AGENT_1_TURN_PROMPT, pdf_content, user_name)
+        return await prompt.generate(self.Agent, conversation_history, current_stage, user_input)
 
 
-        # print(prompt_template)
-
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
-            contents=prompt_template,
-            config={
-                'response_mime_type': 'application/json',
-                'response_schema': self.Agent,
-            },
-        )
-
-        return response.text
-
-
-    def podcast_2(self, user_name = "", pdf_content : str = "", current_stage : int = "", conversation_history : str = "", user_input : str = ""):
-        prompt_template = AGENT_2_PROMPT.format(
-            conversation_history=conversation_history,
-            current_stage=current_stage,
-            user_input=user_input,
-            pdf_content=pdf_content,
-            stages=STAGES,
-            user_name=user_name)
-
-        # print(prompt_template)
-
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
-            contents=prompt_template,
-            config={
-                'response_mime_type': 'application/json',
-                'response_schema': self.Agent,
-            },
-        )
-
-        return response.text
+    async def podcast_2(self, user_name = "", pdf_content : str = "", current_stage : int = "", conversation_history : str = "", user_input : str = ""):
+        prompt = get_session_prompt(AGENT_2_SYSTEM_PROMPT, AGENT_2_TURN_PROMPT, pdf_content, user_name)
+        return await prompt.generate(self.Agent, conversation_history, current_stage, user_input)
 
 
 
 
     async def generate_alex_response(self, conversation_history, conversation_stage, output_queue, pdf_content):
-        loop = asyncio.get_running_loop()
-        alex_response = await loop.run_in_executor(
-            None,  
-            self.podcast_1,  
-            pdf_content, conversation_history, conversation_stage
-        )
+        alex_response = await self.podcast_1(pdf_content=pdf_content, conversation_history=conversation_history, current_stage=conversation_stage)
 
         if alex_response:
             alex = json.loads(alex_response)
@@ -87,12 +44,7 @@ class PodcastAgent:
             output_queue.put(("No response generated", conversation_stage))
 
     async def generate_emma_response(self, conversation_history, conversation_stage, output_queue, pdf_content):
-        loop = asyncio.get_running_loop()
-        emma_response = await loop.run_in_executor(
-            None,  
-            self.podcast_2,  
-            pdf_content, conversation_history, conversation_stage
-        )
+        emma_response = await self.podcast_2(pdf_content=pdf_content, conversation_history=conversation_history, current_stage=conversation_stage)
 
         if emma_response:
             emma = json.loads(emma_response)
@@ -100,18 +52,15 @@ class PodcastAgent:
         else:
             output_queue.put(("No response generated", conversation_stage))
 
-    async def generate_tts(self, text, gender, output_queue):
-         loop = asyncio.get_running_loop()
-         
-         if gender == "male":
-             file_path = await loop.run_in_executor(None, text_to_speech_male_hindi, text)
-         else:
-             file_path = await loop.run_in_executor(None, text_to_speech_female_hindi, text)
- 
-         output_queue.put(file_path)
+    def start_tts(self, text, speaker, split=True, audio_config=None):
+        return start_tts(text, speaker_voice(speaker), split, audio_config)
 
 
 if __name__ == "__main__":    
+    # Whole turns, synthesized on the demo's own threads
+    def speak(text, speaker, output_queue):
+        output_queue.put(synthesize(text, speaker_voice(speaker)))
+
     alex_response_queue = queue.Queue()
     emma_response_queue = queue.Queue()
     alex_tts_queue = queue.Queue()
@@ -126,7 +75,7 @@ if __name__ == "__main__":
     alex_output, conversation_stage = alex_response_queue.get()
     store_chat_history(user_id=id, agent_name="Alex", agent_response= alex_output, agent_conversation_stage=conversation_stage)
     print(f"Alex : {alex_output} Stage : {conversation_stage}")
-    podcast_agent.generate_tts(alex_output, "male", alex_tts_queue)
+    speak(alex_output, "Alex", alex_tts_queue)
 
     # Preload Emma's first response & TTS
     conversation_history = get_chat_history(user_id=id)
@@ -136,7 +85,7 @@ if __name__ == "__main__":
     emma_output, conversation_stage = emma_response_queue.get()
     store_chat_history(user_id=id, agent_name="Emma", agent_response= emma_output, agent_conversation_stage=conversation_stage)
     print(f"Emma : {emma_output} Stage : {conversation_stage}")
-    podcast_agent.generate_tts(emma_output, "female", emma_tts_queue)
+    speak(emma_output, "Emma", emma_tts_queue)
 
     # Generates Alex next response
     conversation_history = get_chat_history(user_id=id)
@@ -150,7 +99,7 @@ if __name__ == "__main__":
         # Start Playing the Alex response in queue and generate the emma response and also alex next reaponse tts
         conversation_history = get_chat_history(user_id=id)
 
-        alex_tts_thread = threading.Thread(target=podcast_agent.generate_tts, args=(alex_output, "male", alex_tts_queue))
+        alex_tts_thread = threading.Thread(target=speak, args=(alex_output, "Alex", alex_tts_queue))
         emma_thread = threading.Thread(target=podcast_agent.generate_emma_response, args=(conversation_history, conversation_stage, emma_response_queue))
 
         alex_tts_thread.start()
@@ -170,7 +119,7 @@ if __name__ == "__main__":
         conversation_history = get_chat_history(user_id=id)
 
         alex_thread = threading.Thread(target=podcast_agent.generate_alex_response, args=(conversation_history, conversation_stage, alex_response_queue))
-        emma_tts_thread = threading.Thread(target=podcast_agent.generate_tts, args=(emma_output, "female", emma_tts_queue))
+        emma_tts_thread = threading.Thread(target=speak, args=(emma_output, "Emma", emma_tts_queue))
 
         alex_thread.start()
         emma_tts_thread.start()
@@ -0,0 +1,111 @@
+import os
+import time
+import asyncio
+import hashlib
+from functools import lru_cache
+from collections import OrderedDict
+from .prompts import STAGES
+from .clients import get_client, generate_content_async
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+
+# Gemini only accepts explicit caches above a minimum token count, smaller prefixes are sent inline
+PROMPT_CACHE_MIN_CHARS = int(os.getenv("PROMPT_CACHE_MIN_CHARS", 16000))
+PROMPT_CACHE_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", 3600))
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", 256))  # Documents remembered per process
+
+# sha256(model, system instruction) -> (cache name or None if caching failed, expiry time), least recently used first
+_context_caches = OrderedDict()
+_context_locks = {}
+
+
+def _prune_context_caches(now):
+    """Forget expired entries, then the least recently used beyond PROMPT_CACHE_MAX_ENTRIES. Locks in use are kept."""
+    for key in list(_context_caches):
+        if _context_caches[key][1] > now and len(_context_caches) <= PROMPT_CACHE_MAX_ENTRIES:
+            continue
+        lock = _context_locks.get(key)
+        if lock is not None and lock.locked():
+            continue
+        del _context_caches[key]
+        _context_locks.pop(key, None)
+
+    # Locks of creations that never stored an entry (cancelled)
+    for key in [key for key, lock in _context_locks.items() if key not in _context_caches and not lock.locked()]:
+        del _context_locks[key]
+
+
+async def get_cached_context(model, system_instruction):
+    """Return the name of a Gemini context cache holding system_instruction, creating it once per document."""
+    if len(system_instruction) < PROMPT_CACHE_MIN_CHARS:
+        return None
+
+    key = hashlib.sha256(f"{model}\x1f{system_instruction}".encode("utf-8")).hexdigest()
+    lock = _context_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        name, expires_at = _context_caches.get(key, (None, 0))
+        if time.time() < expires_at:
+            _context_caches.move_to_end(key)
+            return name
+
+        try:
+            cache = await get_client("genai").aio.caches.create(
+                model=model,
+                config={
+                    "system_instruction": system_instruction,
+                    "ttl": f"{PROMPT_CACHE_TTL_SECONDS}s",
+                    "display_name": f"podcast-{key[:16]}",
+                },
+            )
+            name = cache.name
+        except Exception as e:
+            # Unsupported model or prefix too small, send it inline until the entry expires
+            print(f"Context cache unavailable: {e}")
+            name = None
+
+        # Refresh a little before Gemini drops the cache
+        _context_caches[key] = (name, time.time() + PROMPT_CACHE_TTL_SECONDS * 0.9)
+        _context_caches.move_to_end(key)
+        _prune_context_caches(time.time())
+        return name
+
+
+class SessionPrompt:
+    """Prompt for one agent and document: the static part is rendered (and cached) once, turns only send the delta."""
+
+    def __init__(self, system_template, turn_template, pdf_content="", user_name="", model=LLM_MODEL):
+        self.model = model
+        self.system_instruction = system_template.format(stages=STAGES, pdf_content=pdf_content, user_name=user_name)
+        self.turn_template = turn_template
+
+    def render_turn(self, conversation_history="", current_stage="", user_input=""):
+        return self.turn_template.format(
+            conversation_history=conversation_history,
+            current_stage=current_stage,
+            user_input=user_input)
+
+    async def generate(self, response_schema, conversation_history="", current_stage="", user_input=""):
+        config = {
+            'response_mime_type': 'application/json',
+            'response_schema': response_schema,
+        }
+
+        cached_content = await get_cached_context(self.model, self.system_instruction)
+        if cached_content:
+            config['cached_content'] = cached_content
+        else:
+            config['system_instruction'] = self.system_instruction
+
+        response = await generate_content_async(
+            model=self.model,
+            contents=self.render_turn(conversation_history, current_stage, user_input),
+            config=config,
+        )
+
+        return response.text
+
+
+@lru_cache(maxsize=64)
+def get_session_prompt(system_template, turn_template, pdf_content="", user_name=""):
+    """Shared SessionPrompt per (agent prompt, document), so sessions on the same document reuse it."""
+    return SessionPrompt(system_template, turn_template, pdf_content, user_name)
@@ -0,0 +1,163 @@
+"""Typed messages on the podcast websocket, and the reader that routes them.
+
+Every JSON message carries "type" and "seq", a number increasing per sender; the server
+ignores a client message whose seq is not above the last one it accepted.
+
+Client to server:
+    start_speech  {sample_rate, channels, format}: binary frames that follow are microphone audio
+                  (the session loop gets it with "stream", the SpeechStream receiving them)
+    stop_speech   the user stopped recording, transcribe what was sent
+    cancel        abandon the utterance being recorded, its transcript is not used
+    ack           {turn}: the turn finished playing
+
+Server to client:
+    audio_segment {turn, speaker, text, stage, segment, segments, audio[, format]}: with
+                  "audio": "binary" the audio follows as the next, binary, frame
+    transcript    {text, final}
+    speech_ended  {reason}: the server stopped listening, close the microphone
+    error         {message}
+
+A single reader task receives everything. Binary frames go straight to the speech stream
+that is open, or are dropped once it has ended; control messages are queued for the
+session loop. Nothing waits on timeouts to find out what the client meant.
+"""
+import json
+import asyncio
+from fastapi import WebSocket, WebSocketDisconnect
+
+START_SPEECH = "start_speech"
+STOP_SPEECH = "stop_speech"
+CANCEL = "cancel"
+ACK = "ack"
+CLIENT_MESSAGES = {START_SPEECH, STOP_SPEECH, CANCEL, ACK}
+
+AUDIO_SEGMENT = "audio_segment"
+TRANSCRIPT = "transcript"
+SPEECH_ENDED = "speech_ended"
+ERROR = "error"
+
+
+class SpeechStream:
+    """Audio frames of one utterance, from start_speech until it ends."""
+
+    def __init__(self, start):
+        self.start = start  # The start_speech message, describing the audio format
+        self.frames = asyncio.Queue()  # Binary frames, then None once ended
+        self.reason = None  # Why it ended
+
+    def end(self, reason):
+        if self.reason is None:
+            self.reason = reason
+            self.frames.put_nowait(None)
+
+
+class Connection:
+    """One client websocket: numbered sends, and a reader task dispatching what arrives."""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.events = asyncio.Queue()  # Control messages for the session loop, None once disconnected
+        self.speech = None  # The SpeechStream being recorded, None when not listening
+        self.sent_seq = 0
+        self.received_seq = 0
+        self.turns = 0
+        self.dropped_frames = 0
+        self.closed = False
+        self.send_lock = asyncio.Lock()
+        self.reader = None
+
+    def start(self):
+        self.reader = asyncio.create_task(self.read())
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.cancel()
+
+    async def read(self):
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    self.route_audio(message["bytes"])
+                elif message.get("text") is not None:
+                    self.route_control(message["text"])
+        finally:
+            self.closed = True
+            self.end_speech("disconnected")
+            self.events.put_nowait(None)
+
+    def route_audio(self, data):
+        if self.speech is not None:
+            self.speech.frames.put_nowait(data)
+        else:
+            self.dropped_frames += 1  # Sent after the stream ended, nobody is listening
+
+    def route_control(self, text):
+        try:
+            message = json.loads(text)
+        except ValueError:
+            print(f"Ignoring malformed message: {text[:80]!r}")
+            return
+        kind = message.get("type") if isinstance(message, dict) else None
+        if not isinstance(kind, str) or kind not in CLIENT_MESSAGES:
+            print(f"Ignoring unknown message type {kind!r}")
+            return
+
+        seq = message.get("seq")
+        if seq is not None:
+            if not isinstance(seq, int) or isinstance(seq, bool):
+                print(f"Ignoring {kind} with invalid seq {seq!r}")
+                return
+            if seq <= self.received_seq:
+                print(f"Ignoring {kind} with stale seq {seq}")
+                return
+            self.received_seq = seq
+
+        if kind == START_SPEECH:
+            if self.speech is not None:
+                return  # Already listening
+            # Frames are routed from now on, even before the session loop gets to the message
+            self.speech = SpeechStream(message)
+            message = {**message, "stream": self.speech}
+        elif kind == STOP_SPEECH:
+            self.end_speech("stopped")
+        elif kind == CANCEL:
+            self.end_speech("cancelled")
+        self.events.put_nowait(message)
+
+    @property
+    def speaking(self):
+        return self.speech is not None
+
+    def end_speech(self, reason, stream=None):
+        """End stream (by default the one being recorded); frames arriving later are dropped."""
+        stream = stream or self.speech
+        if stream is None:
+            return
+        stream.end(reason)
+        if self.speech is stream:
+            self.speech = None
+
+    async def next_event(self):
+        """The next control message. Raises WebSocketDisconnect once the client is gone."""
+        message = await self.events.get()
+        if message is None:
+            self.events.put_nowait(None)
+            raise WebSocketDisconnect()
+        return message
+
+    def next_turn_id(self):
+        self.turns += 1
+        return self.turns
+
+    async def send(self, kind, binary=None, **fields):
+        """Send a numbered message, and its binary frame right after it when given."""
+        if self.closed:
+            raise WebSocketDisconnect()
+        async with self.send_lock:
+            self.sent_seq += 1
+            await self.websocket.send_json({"type": kind, "seq": self.sent_seq, **fields})
+            if binary is not None:
+                await self.websocket.send_bytes(binary)
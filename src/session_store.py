@@ -0,0 +1,58 @@
+import os
+import json
+import time
+import socket
+from .conv_history import async_redis_client
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 3600))  # Refreshed on every turn
+
+# Identifies the uvicorn worker (and machine) holding a session's websocket
+WORKER_ID = os.getenv("WORKER_ID", f"{socket.gethostname()}:{os.getpid()}")
+
+
+class SessionStore:
+    """Session metadata in Redis, so any worker or node can see which sessions exist and where they live.
+
+    The websocket itself cannot move: a session is pinned to the worker that accepted it for its
+    whole lifetime, and only the state needed to rebuild it elsewhere (document, history) is shared.
+    """
+
+    def __init__(self, redis_client, ttl_seconds=SESSION_TTL_SECONDS, worker_id=WORKER_ID):
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.worker_id = worker_id
+        self.local = {}  # user_id -> metadata of the sessions on this worker
+
+    async def register(self, user_id, document_id=""):
+        self.local[user_id] = {
+            "worker": self.worker_id,
+            "document_id": document_id,
+            "started": time.time(),
+            "turns": 0,
+        }
+        await self.save(user_id)
+
+    async def touch(self, user_id):
+        """Count a played turn and extend the session's lease."""
+        self.local[user_id]["turns"] += 1
+        await self.save(user_id)
+
+    async def save(self, user_id):
+        await self.redis.set(f"session:{user_id}", json.dumps(self.local[user_id]), ex=self.ttl_seconds)
+
+    async def get(self, user_id):
+        """Metadata of a session on any worker, or None if it ended or expired."""
+        if user_id in self.local:
+            return self.local[user_id]
+        value = await self.redis.get(f"session:{user_id}")
+        return json.loads(value) if value is not None else None
+
+    async def unregister(self, user_id):
+        self.local.pop(user_id, None)
+        await self.redis.delete(f"session:{user_id}")
+
+    def stats(self):
+        return {"worker": self.worker_id, "sessions": len(self.local)}
+
+
+session_store = SessionStore(async_redis_client)
@@ -0,0 +1,118 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", ".cache/summaries.sqlite3")
+SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies of a text share a cache entry."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def text_key(text):
+    return "text:" + hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def file_key(content):
+    return "file:" + hashlib.sha256(content).hexdigest()
+
+
+class SummaryCache:
+    """Persistent content-hash -> (extracted text, summary) cache with TTL and a size bound."""
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, ttl_seconds=SUMMARY_CACHE_TTL_SECONDS, max_bytes=SUMMARY_CACHE_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                extracted_text TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS summaries_accessed ON summaries (accessed)")
+        self.db.commit()
+
+    def get(self, key):
+        """Return {"extracted_text", "summary"} for a key, or None on a miss or expired entry."""
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT extracted_text, summary FROM summaries WHERE key = ? AND created > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.db.execute("UPDATE summaries SET accessed = ? WHERE key = ?", (now, key))
+            self.db.commit()
+            self.hits += 1
+            return {"extracted_text": row[0], "summary": row[1]}
+
+    def peek(self, *keys):
+        """Like get for the first of keys present, without counting a lookup or refreshing its use."""
+        with self.lock:
+            for key in keys:
+                row = self.db.execute(
+                    "SELECT extracted_text, summary FROM summaries WHERE key = ? AND created > ?",
+                    (key, time.time() - self.ttl_seconds),
+                ).fetchone()
+                if row is not None:
+                    return {"extracted_text": row[0], "summary": row[1]}
+        return None
+
+    def put(self, key, summary, extracted_text=""):
+        now = time.time()
+        size = len(summary.encode("utf-8")) + len(extracted_text.encode("utf-8"))
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO summaries (key, extracted_text, summary, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, extracted_text, summary, size, now, now),
+            )
+            self.evict(now)
+            self.db.commit()
+
+    def evict(self, now):
+        """Drop expired entries, then least recently used ones until the size bound is met. Caller holds the lock."""
+        self.db.execute("DELETE FROM summaries WHERE created <= ?", (now - self.ttl_seconds,))
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self.db.execute("SELECT key, size FROM summaries ORDER BY accessed").fetchall():
+            self.db.execute("DELETE FROM summaries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self.lock:
+            entries, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+summary_cache = SummaryCache()
@@ -1,33 +1,178 @@
-from google import genai
 import os
-from google.api_core.client_options import ClientOptions
+import io
+import re
 from google.cloud import documentai
+from .clients import get_client, LOCATION, BACKEND
+from .executors import chunk_executor, ExecutorBusy
 
 
 PROJECT_ID = "neurosphere-453417"
-LOCATION = "us"
 PROCESSOR_ID = "9b0aee16552bdce0"
 mime_type = "application/pdf"
 
+# Born-digital pages are read from the PDF's own text layer, only pages without one are OCRed
+LOCAL_TEXT_LAYER = os.getenv("LOCAL_TEXT_LAYER", "true").lower() == "true"
+MIN_TEXT_LAYER_CHARS = int(os.getenv("MIN_TEXT_LAYER_CHARS", 20))
+
+# Large documents are OCRed and summarised in chunks, in parallel in the bounded chunk pool
+PAGES_PER_CHUNK = int(os.getenv("PAGES_PER_CHUNK", 10))  # Document AI online requests are limited to 15 pages
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", 60000))
+
+SUMMARY_PROMPT = """
+        Summarize the following text in depth don't remove details and make points if possible. 
+        - Capture the main ideas and key points.
+        - Avoid unnecessary details and repetition.
+        - Ensure readability and coherence.
+
+         Note:
+        generate the responses in plain text.
+        do not generate any asterisk or any other special characters.
+
+
+        Text:
+        {text}
+        """
+
+REDUCE_PROMPT = """
+        The following are summaries of consecutive sections of one document, in order.
+        Combine them into a single in depth summary of the whole document, don't remove details and make points if possible.
+        - Merge points that repeat across sections.
+        - Keep the order in which the document presents them.
+        - Ensure readability and coherence.
+
+         Note:
+        generate the responses in plain text.
+        do not generate any asterisk or any other special characters.
+
+
+        Section summaries:
+        {text}
+        """
+
+
+def read_pdf(content):
+    """Open PDF bytes with pypdf, or return None if pypdf is unavailable or cannot parse the file."""
+    try:
+        from pypdf import PdfReader
+        return PdfReader(io.BytesIO(content))
+    except Exception:
+        return None
+
+
+def page_text(page):
+    """Text layer of a page, empty for scanned pages."""
+    try:
+        return page.extract_text() or ""
+    except Exception:
+        return ""
+
+
+def page_runs(indices, max_pages=PAGES_PER_CHUNK):
+    """Group sorted page indices into runs of consecutive pages, at most max_pages long."""
+    runs = []
+    for index in indices:
+        if runs and index == runs[-1][-1] + 1 and len(runs[-1]) < max_pages:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+    return runs
+
+
+def write_pages(reader, indices):
+    """Standalone PDF holding only the given pages."""
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for index in indices:
+        writer.add_page(reader.pages[index])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def map_chunks(fn, items):
+    """fn over items in the chunk pool, results in order. Raises ExecutorBusy if the pool is full."""
+    futures = []
+    try:
+        for item in items:
+            futures.append(chunk_executor.submit(fn, item))
+    except ExecutorBusy:
+        for future in futures:
+            future.cancel()
+        raise
+    return [future.result() for future in futures]
+
+
+def split_text(text, max_chars=SUMMARY_CHUNK_CHARS):
+    """Split text into chunks of at most max_chars, preferring paragraph and sentence boundaries."""
+    chunks = []
+    current = ""
+    for piece in re.split(r"(?<=\n\n)|(?<=[.!?।] )", text):
+        while len(piece) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(piece[:max_chars])
+            piece = piece[max_chars:]
+        if len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
 class TextProcessing:
     def __init__(self):
         pass
 
     def extract_text_from_pdf(self, file_path):
         """Extracts text from a PDF using Google Document AI."""
-        
-        # Instantiate a Document AI client
-        docai_client = documentai.DocumentProcessorServiceClient(
-            client_options=ClientOptions(api_endpoint=f"{LOCATION}-documentai.googleapis.com")
-        )
-
-        # Define the full resource name of the processor
-        resource_name = docai_client.processor_path(PROJECT_ID, LOCATION, PROCESSOR_ID)
 
         # Read the file into memory
         with open(file_path, "rb") as file:
             image_content = file.read()
 
+        return self.extract_text_from_bytes(image_content)
+
+    def extract_text_from_bytes(self, image_content):
+        """Extracts text from in-memory PDF bytes.
+
+        Pages with a text layer are read locally, the remaining pages are OCRed in
+        parallel runs of at most PAGES_PER_CHUNK pages.
+        """
+        reader = read_pdf(image_content)
+        if reader is None:
+            return self.ocr_document(image_content)
+
+        pages = len(reader.pages)
+        texts = [page_text(page) for page in reader.pages] if LOCAL_TEXT_LAYER else [""] * pages
+        missing = [index for index, text in enumerate(texts) if len(text.strip()) < MIN_TEXT_LAYER_CHARS]
+        if len(missing) == pages and pages <= PAGES_PER_CHUNK:
+            return self.ocr_document(image_content)
+
+        # pypdf is not thread-safe, build the sub-documents here and only OCR in parallel
+        runs = page_runs(missing)
+        documents = [write_pages(reader, run) for run in runs]
+        for run, text in zip(runs, map_chunks(self.ocr_document, documents)):
+            for index in run:
+                texts[index] = ""
+            if text != "No text extracted.":
+                texts[run[0]] = text
+
+        text = "".join(page if page.endswith("\n") else page + "\n" for page in texts if page.strip())
+        return text if text else "No text extracted."
+
+    def ocr_document(self, image_content):
+        """Extracts text from one PDF request using Google Document AI."""
+        
+        # Shared Document AI client
+        docai_client = get_client("documentai")
+
+        # Define the full resource name of the processor
+        resource_name = docai_client.processor_path(PROJECT_ID, LOCATION, PROCESSOR_ID)
+
         # Load Binary Data into Document AI RawDocument Object
         raw_document = documentai.RawDocument(content=image_content, mime_type=mime_type)
 
@@ -43,26 +188,30 @@ class TextProcessing:
 
 
     def summarise(self, text):
-        api_key = os.getenv("GEMINI_API_KEY")  
-        if not api_key:
-            raise ValueError("API key not found. Set the GOOGLE_GENAI_API_KEY environment variable.")
+        """Summarise text, map-reducing over chunks when it is too large for one prompt.
 
-        client = genai.Client(api_key=api_key)
+        Every Gemini call runs in the chunk pool, so summaries share one bound on concurrent calls.
+        """
+        if len(text) <= SUMMARY_CHUNK_CHARS:
+            return map_chunks(self.generate, [SUMMARY_PROMPT.format(text=text)])[0]
 
-        prompt = f"""
-        Summarize the following text in depth don't remove details and make points if possible. 
-        - Capture the main ideas and key points.
-        - Avoid unnecessary details and repetition.
-        - Ensure readability and coherence.
+        summaries = map_chunks(self.generate, [SUMMARY_PROMPT.format(text=chunk) for chunk in split_text(text)])
 
-         Note:
-        generate the responses in plain text.
-        do not generate any asterisk or any other special characters.
+        # Reduce in parallel groups until the partial summaries fit in one prompt
+        while len(summaries) > 1 and sum(len(summary) for summary in summaries) > SUMMARY_CHUNK_CHARS:
+            groups = split_text("\n\n".join(summaries))
+            if len(groups) >= len(summaries):
+                break
+            summaries = map_chunks(self.generate, [REDUCE_PROMPT.format(text=group) for group in groups])
 
+        return map_chunks(self.generate, [REDUCE_PROMPT.format(text="\n\n".join(summaries))])[0]
 
-        Text:
-        {text}
-        """
+    def generate(self, prompt):
+        api_key = os.getenv("GEMINI_API_KEY")  
+        if not api_key and BACKEND == "google":
+            raise ValueError("API key not found. Set the GOOGLE_GENAI_API_KEY environment variable.")
+
+        client = get_client("genai")
 
         response = client.models.generate_content(
             model="gemini-2.0-flash",
@@ -1,128 +1,257 @@
 import os
 from google.cloud import texttospeech
 import time 
-import uuid
+import re
+import base64
+import threading
+from collections import deque
+from .tts_cache import get_audio_cache, disk_caches, make_key, key_from_file_name
+from .clients import get_client
+from .executors import tts_executor
+from .voices import get_voice
 
 # Set the path to your JSON key file
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = r"/Users/probindhakal/Desktop/InfernoCastAI/neurosphere-453417-a13fa049f648.json"
 
-def text_to_speech_female(text):
-    client = texttospeech.TextToSpeechClient()
+# Encoding -> (file extension, MIME type). LINEAR16 comes back as a WAV file, header included
+AUDIO_FORMATS = {
+    "MP3": ("mp3", "audio/mpeg"),
+    "OGG_OPUS": ("ogg", "audio/ogg"),
+    "LINEAR16": ("wav", "audio/wav"),
+}
 
-    synthesis_input = texttospeech.SynthesisInput(text=text)
-    uuid_ = uuid.uuid4()
-    output_file=f"../frontend/src/assets/female_{uuid_}.mp3"
-    voice = texttospeech.VoiceSelectionParams(
-        language_code="en-US",
-        name="en-US-Chirp-HD-F",
-        ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
-    )
+# Defaults for sessions that do not pick a format; sample rate 0 keeps the voice's native rate
+TTS_ENCODING = os.getenv("TTS_ENCODING", "MP3")
+MIN_SAMPLE_RATE, MAX_SAMPLE_RATE = 8000, 48000  # Rates Google TTS resamples to
+TTS_SAMPLE_RATE = int(os.getenv("TTS_SAMPLE_RATE", 0))
 
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3
-    )
 
-    response = client.synthesize_speech(
-        input=synthesis_input, 
-        voice=voice, 
-        audio_config=audio_config
+def make_audio_config(encoding=TTS_ENCODING, sample_rate_hertz=TTS_SAMPLE_RATE):
+    """AudioConfig for one of AUDIO_FORMATS. Google TTS has no bitrate setting, the sample rate sets the size."""
+    encoding = encoding.upper()
+    if encoding not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported audio encoding {encoding!r}, expected one of {', '.join(AUDIO_FORMATS)}")
+    if sample_rate_hertz != 0 and not MIN_SAMPLE_RATE <= sample_rate_hertz <= MAX_SAMPLE_RATE:
+        raise ValueError(f"Sample rate must be 0 (the voice's native rate) or {MIN_SAMPLE_RATE}-{MAX_SAMPLE_RATE} Hz")
+
+    return texttospeech.AudioConfig(
+        audio_encoding=texttospeech.AudioEncoding[encoding],
+        sample_rate_hertz=sample_rate_hertz
     )
 
-    with open(output_file, "wb") as out:
-        out.write(response.audio_content)
-    
-    print(f"Audio content written to {output_file}")
-    return f"src/assets/female_{uuid_}.mp3"
 
+def audio_format(audio_config):
+    """(file extension, MIME type) of the audio produced with audio_config."""
+    return AUDIO_FORMATS[audio_config.audio_encoding.name]
 
-def text_to_speech_female_hindi(text):
-    client = texttospeech.TextToSpeechClient()
 
-    synthesis_input = texttospeech.SynthesisInput(text=text)
-    uuid_ = uuid.uuid4()
-    output_file=f"frontend/src/assets/female_{uuid_}.mp3"
-    voice = texttospeech.VoiceSelectionParams(
-        language_code="hi-IN",
-        name="hi-IN-Chirp3-HD-Aoede",
-        ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
-    )
+def audio_mime(audio_content):
+    """MIME type of synthesized audio bytes, from their container signature."""
+    if audio_content.startswith(b"OggS"):
+        return "audio/ogg"
+    if audio_content.startswith(b"RIFF"):
+        return "audio/wav"
+    return "audio/mpeg"
 
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3
-    )
 
-    response = client.synthesize_speech(
-        input=synthesis_input, 
-        voice=voice, 
-        audio_config=audio_config
-    )
+AUDIO_CONFIG = make_audio_config()
 
-    with open(output_file, "wb") as out:
-        out.write(response.audio_content)
-    
-    print(f"Audio content written to {output_file}")
-    return f"src/assets/female_{uuid_}.mp3"
+# "file": return a URL (TTS_OUTPUT_URL) the Vite dev server serves from TTS_OUTPUT_DIR (single process only)
+# "inline": return the audio itself as a data URL, so any worker or node can serve the session
+# "websocket": return the audio bytes, sent to the client as a binary websocket frame
+# Only "file" writes to disk, the other modes cache audio in memory
+AUDIO_DELIVERY = os.getenv("AUDIO_DELIVERY", "file")
 
 
-def text_to_speech_male(text):
-    client = texttospeech.TextToSpeechClient()
+# Every voice writes here in "file" mode; the app runs from the repository root
+TTS_OUTPUT_DIR = os.getenv("TTS_OUTPUT_DIR", "frontend/src/assets")
+# Where the client fetches those files, by default their path under the Vite dev server's root (frontend/)
+TTS_OUTPUT_URL = os.getenv("TTS_OUTPUT_URL", os.path.relpath(TTS_OUTPUT_DIR, "frontend").replace(os.sep, "/")).rstrip("/") + "/"
+TTS_PROFILE_SAMPLES = 512  # Latencies kept per voice for the percentiles in stats()
 
-    synthesis_input = texttospeech.SynthesisInput(text=text)
-    uuid_ = uuid.uuid4()
-    output_file=f"../frontend/src/assets/male_{uuid_}.mp3"
-    voice = texttospeech.VoiceSelectionParams(
-        language_code="en-US",
-        name="en-US-Chirp-HD-D",
-        ssml_gender=texttospeech.SsmlVoiceGender.MALE
-    )
 
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3
-    )
+class SynthesisEngine:
+    """Synthesizes text with a voice profile from src/voices.py.
 
-    response = client.synthesize_speech(
-        input=synthesis_input, 
-        voice=voice, 
-        audio_config=audio_config
-    )
+    Request objects are built once per voice and audio format, clients come from the pool in
+    src/clients.py, and every synthesis is timed per voice.
+    """
 
-    with open(output_file, "wb") as out:
-        out.write(response.audio_content)
+    def __init__(self, output_dir=TTS_OUTPUT_DIR):
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        self.voice_params = {}  # VoiceProfile -> VoiceSelectionParams
+        self.audio_configs = {}  # (VoiceProfile, session AudioConfig) -> AudioConfig used
+        self.profiles = {}  # voice name -> counters and recent latencies
 
+    def voice_params_for(self, voice):
+        params = self.voice_params.get(voice)
+        if params is None:
+            params = texttospeech.VoiceSelectionParams(
+                language_code=voice.language_code,
+                name=voice.name,
+                ssml_gender=texttospeech.SsmlVoiceGender[voice.gender]
+            )
+            self.voice_params[voice] = params
+        return params
 
-    print(f"Audio content written to {output_file}")
-    return f"src/assets/male_{uuid_}.mp3"
+    def audio_config_for(self, voice, audio_config=None):
+        """The session's audio format, unless the voice is pinned to an encoding."""
+        audio_config = audio_config or AUDIO_CONFIG
+        if voice.encoding is None or voice.encoding == audio_config.audio_encoding.name:
+            return audio_config
 
+        key = (voice, str(audio_config))
+        pinned = self.audio_configs.get(key)
+        if pinned is None:
+            pinned = make_audio_config(voice.encoding, audio_config.sample_rate_hertz)
+            self.audio_configs[key] = pinned
+        return pinned
 
+    def synthesize(self, text, voice, audio_config=None):
+        """Synthesize text, reusing cached audio for repeated lines. Returns it in the AUDIO_DELIVERY form."""
+        params = self.voice_params_for(voice)
+        audio_config = self.audio_config_for(voice, audio_config)
+        extension, mime_type = audio_format(audio_config)
+        cache = get_audio_cache(self.output_dir if AUDIO_DELIVERY == "file" else None, extension)
+        key = make_key(params.language_code, params.name, params.ssml_gender, audio_config, text)
 
-def text_to_speech_male_hindi(text):
-    client = texttospeech.TextToSpeechClient()
+        file_name = cache.get(key)
+        audio_content = None
+        if file_name is not None and AUDIO_DELIVERY != "file":
+            audio_content = cache.read(key)
+            if audio_content is None:
+                file_name = None  # Evicted in between, synthesize again
 
-    synthesis_input = texttospeech.SynthesisInput(text=text)
-    uuid_ = uuid.uuid4()
-    output_file=f"frontend/src/assets/male_{uuid_}.mp3"
-    voice = texttospeech.VoiceSelectionParams(
-        language_code="hi-IN",
-        name="hi-IN-Chirp3-HD-Charon",
-        ssml_gender=texttospeech.SsmlVoiceGender.MALE
-    )
+        if file_name is None:
+            start = time.perf_counter()
+            response = get_client("tts").synthesize_speech(
+                input=texttospeech.SynthesisInput(text=text),
+                voice=params,
+                audio_config=audio_config
+            )
+            self.record(voice, time.perf_counter() - start, len(response.audio_content))
 
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3
-    )
+            audio_content = response.audio_content
+            file_name = cache.put(key, audio_content)
+            if AUDIO_DELIVERY == "file":
+                print(f"Audio content written to {self.output_dir}/{file_name}")
+        else:
+            self.record(voice, None, 0)
 
-    response = client.synthesize_speech(
-        input=synthesis_input, 
-        voice=voice, 
-        audio_config=audio_config
-    )
+        if AUDIO_DELIVERY == "websocket":
+            return audio_content
+        if AUDIO_DELIVERY == "inline":
+            return f"data:{mime_type};base64," + base64.b64encode(audio_content).decode("ascii")
+        return TTS_OUTPUT_URL + file_name
+
+    def record(self, voice, seconds, audio_bytes):
+        """Count a request for voice; seconds is None for a cache hit."""
+        with self.lock:
+            profile = self.profiles.get(voice.name)
+            if profile is None:
+                profile = {"requests": 0, "cache_hits": 0, "audio_bytes": 0, "latencies": deque(maxlen=TTS_PROFILE_SAMPLES)}
+                self.profiles[voice.name] = profile
+            profile["requests"] += 1
+            if seconds is None:
+                profile["cache_hits"] += 1
+            else:
+                profile["latencies"].append(seconds * 1000)
+                profile["audio_bytes"] += audio_bytes
+
+    def stats(self):
+        """Per-voice request counts and synthesis latency (ms) over the recent requests."""
+        with self.lock:
+            stats = {}
+            for name, profile in self.profiles.items():
+                latencies = sorted(profile["latencies"])
+                stats[name] = {
+                    "requests": profile["requests"],
+                    "cache_hits": profile["cache_hits"],
+                    "audio_bytes": profile["audio_bytes"],
+                    "latency_ms_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                    "latency_ms_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+                    "latency_ms_p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+                }
+            return stats
+
+
+engine = SynthesisEngine()
+
+
+def synthesize(text, voice, audio_config=None):
+    return engine.synthesize(text, voice, audio_config)
+
+
+# Fixed-voice shortcuts, kept for scripts written against them
+def text_to_speech_female(text, audio_config=None):
+    return engine.synthesize(text, get_voice("en-US-female"), audio_config)
+
+
+def text_to_speech_female_hindi(text, audio_config=None):
+    return engine.synthesize(text, get_voice("hi-IN-female"), audio_config)
+
+
+def text_to_speech_male(text, audio_config=None):
+    return engine.synthesize(text, get_voice("en-US-male"), audio_config)
+
+
+def text_to_speech_male_hindi(text, audio_config=None):
+    return engine.synthesize(text, get_voice("hi-IN-male"), audio_config)
+
+
+def hold_audio(session_id, audio):
+    """Keep a file returned by synthesize on disk until the session is released."""
+    if not isinstance(audio, str) or not audio.startswith(TTS_OUTPUT_URL):
+        return  # Audio sent with the message, nothing on disk to track
+    key = key_from_file_name(audio)
+    for cache in disk_caches():
+        cache.hold(key, session_id)
+
+
+def release_audio(session_id):
+    """Called when a session ends: its files become eligible for deletion."""
+    for cache in disk_caches():
+        cache.release(session_id)
+
+
+def sweep_audio():
+    """Delete expired files, for when no audio is synthesized or released for a while."""
+    for cache in disk_caches():
+        cache.sweep()
+
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?।])\s+")
+MIN_SENTENCE_CHARS = 20  # Shorter fragments are merged into the next sentence
+
+
+def split_sentences(text):
+    """Split a turn into sentences, merging tiny fragments like "Haha!" forward."""
+    sentences = []
+    pending = ""
+    for part in SENTENCE_BOUNDARY.split(text.strip()):
+        pending = f"{pending} {part}".strip()
+        if len(pending) >= MIN_SENTENCE_CHARS:
+            sentences.append(pending)
+            pending = ""
+
+    if pending:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+
+    return sentences
 
-    with open(output_file, "wb") as out:
-        out.write(response.audio_content)
 
+def start_tts(text, voice, split=True, audio_config=None):
+    """Start synthesizing a turn concurrently with a voice profile, returning one future per sentence in playback order."""
+    if split:
+        segments = split_sentences(text)
+    else:
+        segments = [text] if text.strip() else []
+    return [tts_executor.run(engine.synthesize, segment, voice, audio_config) for segment in segments]
 
-    print(f"Audio content written to {output_file}")
-    return f"src/assets/male_{uuid_}.mp3"
 
 if __name__ == "__main__":
     start = time.time()
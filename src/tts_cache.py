@@ -0,0 +1,297 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Size bounds for the synthesized audio cache
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))  # On disk
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))  # In memory
+TTS_CACHE_TTL_SECONDS = int(os.getenv("TTS_CACHE_TTL_SECONDS", 24 * 3600))  # Since last use
+TTS_CACHE_SWEEP_SECONDS = int(os.getenv("TTS_CACHE_SWEEP_SECONDS", 600))  # Between TTL sweeps, 0 disables them
+# Delete a session's files when it disconnects, unless another live session still plays them.
+# Off by default: released files stay cached (stock phrases are shared across sessions) and
+# TTL / LRU decide when they go. Turn on to trade those cache hits for less disk use.
+TTS_DELETE_ON_RELEASE = os.getenv("TTS_DELETE_ON_RELEASE", "false").lower() == "true"
+
+CACHE_PREFIX = "tts_"
+
+
+def make_key(*parts):
+    """Content address of a synthesis request: voice, language, audio config and text."""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def key_from_file_name(file_name):
+    """Inverse of AudioCache.file_name, None for files the cache did not write."""
+    name = os.path.basename(file_name)
+    if not name.startswith(CACHE_PREFIX) or "." not in name:
+        return None
+    return name[len(CACHE_PREFIX):].rsplit(".", 1)[0]
+
+
+class AudioCache:
+    """Size-bounded LRU cache of synthesized audio, kept on disk with a hot in-memory layer.
+
+    Files sent to a session are held for it until it is released, so they are never evicted
+    while a client may still fetch them. Unheld files expire ttl_seconds after their last use.
+    """
+
+    def __init__(self, directory, extension="mp3", max_bytes=TTS_CACHE_MAX_BYTES, max_memory_bytes=TTS_CACHE_MEMORY_BYTES,
+                 ttl_seconds=TTS_CACHE_TTL_SECONDS, delete_on_release=TTS_DELETE_ON_RELEASE):
+        self.directory = directory
+        self.extension = extension
+        self.max_bytes = max_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl_seconds = ttl_seconds
+        self.delete_on_release = delete_on_release
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> size on disk, least recently used first
+        self.accessed = {}  # key -> time of last use
+        self.memory = OrderedDict()  # key -> audio bytes, least recently used first
+        self.holders = {}  # key -> ids of the sessions it was sent to
+        self.sessions = {}  # session id -> keys it holds
+        self.disk_bytes = 0
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.released = 0
+        self.load()
+
+    def file_name(self, key):
+        return f"{CACHE_PREFIX}{key}.{self.extension}"
+
+    def load(self):
+        """Index audio already on disk so the cache survives restarts."""
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = f".{self.extension}"
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(CACHE_PREFIX) and entry.name.endswith(suffix):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[len(CACHE_PREFIX):-len(suffix)], stat.st_size))
+
+        for mtime, key, size in sorted(found):
+            self.entries[key] = size
+            self.accessed[key] = mtime
+            self.disk_bytes += size
+
+        with self.lock:
+            self.evict()
+
+    def get(self, key):
+        """Return the cached file name for a key, or None on a miss."""
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.accessed[key] = time.time()
+
+        try:
+            os.utime(os.path.join(self.directory, self.file_name(key)))
+        except FileNotFoundError:
+            # Evicted or removed behind our back, synthesize again
+            with self.lock:
+                if key in self.entries:
+                    self.disk_bytes -= self.entries.pop(key)
+                    del self.accessed[key]
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return self.file_name(key)
+
+    def read(self, key):
+        """Return the cached audio bytes for a key, or None on a miss."""
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+            if key not in self.entries:
+                return None
+
+        try:
+            with open(os.path.join(self.directory, self.file_name(key)), "rb") as audio_file:
+                audio_content = audio_file.read()
+        except FileNotFoundError:
+            return None
+
+        with self.lock:
+            self.remember(key, audio_content)
+        return audio_content
+
+    def put(self, key, audio_content):
+        """Store synthesized audio and return its file name."""
+        file_name = self.file_name(key)
+        path = os.path.join(self.directory, file_name)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as out:
+            out.write(audio_content)
+        os.replace(temp_path, path)
+
+        with self.lock:
+            if key in self.entries:
+                self.disk_bytes -= self.entries[key]
+            self.entries[key] = len(audio_content)
+            self.entries.move_to_end(key)
+            self.accessed[key] = time.time()
+            self.disk_bytes += len(audio_content)
+            self.remember(key, audio_content)
+            self.evict(keep=key)
+
+        return file_name
+
+    def remember(self, key, audio_content):
+        if len(audio_content) > self.max_memory_bytes:
+            return
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key))
+        self.memory[key] = audio_content
+        self.memory_bytes += len(audio_content)
+        while self.memory_bytes > self.max_memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    def hold(self, key, session_id):
+        """Keep a file on disk while session_id may still fetch it."""
+        with self.lock:
+            if key not in self.entries:
+                return
+            self.holders.setdefault(key, set()).add(session_id)
+            self.sessions.setdefault(session_id, set()).add(key)
+
+    def release(self, session_id):
+        """Drop a finished session's holds; unheld files are left to TTL and LRU eviction.
+
+        With delete_on_release, files no other session holds are deleted at once instead.
+        """
+        with self.lock:
+            for key in self.sessions.pop(session_id, ()):
+                holders = self.holders.get(key)
+                if holders is None:
+                    continue
+                holders.discard(session_id)
+                if holders:
+                    continue
+                del self.holders[key]
+                if self.delete_on_release and key in self.entries:
+                    self.remove(key)
+                    self.released += 1
+            self.evict()
+
+    def sweep(self):
+        """Expire and evict now; otherwise that only happens when audio is written or released."""
+        with self.lock:
+            self.evict()
+
+    def remove(self, key):
+        """Delete one entry and its file. Caller holds the lock."""
+        self.disk_bytes -= self.entries.pop(key)
+        del self.accessed[key]
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key))
+        try:
+            os.remove(os.path.join(self.directory, self.file_name(key)))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, keep=None):
+        """Drop expired files, then least recently used ones until the disk budget is met.
+
+        Held files and keep (the file just written) are skipped, so the budget can be exceeded
+        while live sessions need more. Caller holds the lock.
+        """
+        deadline = time.time() - self.ttl_seconds
+        for key in list(self.entries):
+            if self.accessed[key] > deadline:
+                break  # Entries are in order of last use
+            if key not in self.holders:
+                self.remove(key)
+                self.expired += 1
+
+        if self.disk_bytes <= self.max_bytes:
+            return
+        for key in list(self.entries):
+            if key in self.holders or key == keep:
+                continue
+            self.remove(key)
+            self.evicted += 1
+            if self.disk_bytes <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self.lock:
+            return {
+                "files": len(self.entries),
+                "disk_bytes": self.disk_bytes,
+                "memory_bytes": self.memory_bytes,
+                "held_files": len(self.holders),
+                "sessions": len(self.sessions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "released": self.released,
+            }
+
+
+class MemoryAudioCache(AudioCache):
+    """AudioCache that never touches the disk, for audio sent straight to the client."""
+
+    def __init__(self, max_memory_bytes=TTS_CACHE_MEMORY_BYTES):
+        super().__init__(None, max_bytes=0, max_memory_bytes=max_memory_bytes)
+
+    def load(self):
+        pass
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.memory:
+                self.misses += 1
+                return None
+            self.memory.move_to_end(key)
+            self.hits += 1
+        return self.file_name(key)
+
+    def put(self, key, audio_content):
+        with self.lock:
+            self.remember(key, audio_content)
+        return self.file_name(key)
+
+    def evict(self, keep=None):
+        pass  # remember() already bounds the memory
+
+    def stats(self):
+        stats = super().stats()
+        stats["files"] = len(self.memory)
+        return stats
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_audio_cache(directory, extension="mp3"):
+    """Return the process-wide cache for an output directory and file type, or the in-memory one for None."""
+    # Keys include the audio config, so every format can share the in-memory cache
+    key = (os.path.abspath(directory), extension) if directory is not None else None
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = AudioCache(*key) if key is not None else MemoryAudioCache()
+        return _caches[key]
+
+
+def disk_caches():
+    with _caches_lock:
+        return [cache for key, cache in _caches.items() if key is not None]
+
+
+def audio_cache_stats():
+    """Stats of every audio cache in this process, by files ("memory" for the in-memory one)."""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {f"{key[0]}/*.{key[1]}" if key else "memory": cache.stats() for key, cache in caches.items()}
@@ -0,0 +1,82 @@
+import os
+import queue
+import asyncio
+from collections import deque, namedtuple
+from .conv_history import format_chat_entry, HISTORY_WINDOW
+from .tts import AUDIO_CONFIG
+
+# Number of future turns kept generated (text and audio) ahead of playback
+LOOKAHEAD_TURNS = int(os.getenv("LOOKAHEAD_TURNS", 2))
+
+# audio holds one future per audio segment, resolving to the file path, in playback order
+Turn = namedtuple("Turn", ["speaker", "text", "stage", "audio"])
+
+NEXT_SPEAKER = {"Alex": "Emma", "Emma": "Alex"}
+
+
+class TurnPipeline:
+    """Speculatively generates the next podcast turns of a session into a bounded buffer.
+
+    Buffered turns are not part of the stored history until they are played, so
+    invalidating the pipeline (e.g. when the user interrupts) discards them cleanly.
+    """
+
+    def __init__(self, agent, history, pdf_content, depth=LOOKAHEAD_TURNS, split_audio=True, audio_config=AUDIO_CONFIG):
+        self.agent = agent
+        self.history = history  # SessionHistory of the played turns
+        self.pdf_content = pdf_content
+        self.split_audio = split_audio
+        self.audio_config = audio_config
+        self.buffer = asyncio.Queue(maxsize=max(1, depth))
+        self.producer = None
+
+    def start(self, speaker="Alex", conversation_stage="1"):
+        """Start generating turns from the stored history, beginning with speaker."""
+        self.invalidate()
+        self.producer = asyncio.create_task(self.produce(speaker, conversation_stage))
+
+    async def produce(self, speaker, conversation_stage):
+        # Played history plus the turns generated ahead of playback
+        await self.history.get()
+        history = deque(self.history.lines, maxlen=HISTORY_WINDOW)
+        output_queue = queue.Queue()
+
+        while True:
+            if speaker == "Alex":
+                await self.agent.generate_alex_response("\n".join(history), conversation_stage, output_queue, self.pdf_content)
+            else:
+                await self.agent.generate_emma_response("\n".join(history), conversation_stage, output_queue, self.pdf_content)
+            text, conversation_stage = output_queue.get()
+
+            history.append(format_chat_entry(speaker, text, conversation_stage))
+            # Files are held for the session when sent (send_turn): a turn that is never sent is cancelled
+            audio = self.agent.start_tts(text, speaker, self.split_audio, self.audio_config)
+            try:
+                await self.buffer.put(Turn(speaker, text, conversation_stage, audio))
+            except asyncio.CancelledError:
+                for segment in audio:
+                    segment.cancel()
+                raise
+            speaker = NEXT_SPEAKER[speaker]
+
+    async def next_turn(self):
+        """Wait for the next turn, re-raising any error from the producer."""
+        getter = asyncio.ensure_future(self.buffer.get())
+        await asyncio.wait({getter, self.producer}, return_when=asyncio.FIRST_COMPLETED)
+        if getter.done():
+            return getter.result()
+
+        getter.cancel()
+        self.producer.result()
+        raise RuntimeError("Turn pipeline stopped")
+
+    def invalidate(self):
+        """Stop generating and drop every buffered turn."""
+        if self.producer is not None:
+            self.producer.cancel()
+            self.producer = None
+
+        while not self.buffer.empty():
+            turn = self.buffer.get_nowait()
+            for segment in turn.audio:
+                segment.cancel()
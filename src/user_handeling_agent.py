@@ -1,20 +1,18 @@
-from .prompts import USER_HANDLING_PROMPT, STAGES, PDF_CONTENT
-from google import genai
+from .prompts import USER_HANDLING_SYSTEM_PROMPT, USER_HANDLING_TURN_PROMPT, PDF_CONTENT
 from dotenv import load_dotenv
-import os
 from pydantic import BaseModel,TypeAdapter, Field
 from typing import List
 import json
 import playsound
 import threading
-from .tts import text_to_speech_male, text_to_speech_female, text_to_speech_female_hindi, text_to_speech_male_hindi
+from .tts import synthesize, start_tts
+from .voices import speaker_voice
 from .conv_history import get_chat_history, store_chat_history
-import asyncio
+from .prompt_cache import get_session_prompt
 # from summary import summary_generator
 load_dotenv()
 import queue
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
 class HandelUser:
     def __init__(self):
@@ -27,49 +25,27 @@ class HandelUser:
         Emma_output : str = Field(description="Current output of agent")
 
 
-    def podcast_1(self, user_name : str = "", pdf_content : str = "", current_stage : int = "", conversation_history : str = "", user_input : str = ""):
-        prompt_template = USER_HANDLING_PROMPT.format(
-            conversation_history=conversation_history,
-            current_stage=current_stage,
-            user_input=user_input,
-            pdf_content=pdf_content,
-            stages=STAGES,
-            user_name=user_name)
+    async def podcast_1(self, user_name : str = "", pdf_content : str = "", current_stage : int = "", conversation_history : str = "", user_input : str = ""):
+        # Static instructions, stages and content are rendered and cached once per document
+        prompt = get_session_prompt(USER_HANDLING_SYSTEM_PROMPT, USER_HANDLING_TURN_PROMPT, pdf_content, user_name)
+        return await prompt.generate(self.Agent, conversation_history, current_stage, user_input)
 
 
-        # print(prompt_template)
-
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
-            contents=prompt_template,
-            config={
-                'response_mime_type': 'application/json',
-                'response_schema': self.Agent,
-            },
-        )
-
-        return response.text
-
-
-    async def generate_tts(self, text, gender, output_queue):
-        loop = asyncio.get_running_loop()
-
-        if gender == "male":
-            file_path = await loop.run_in_executor(None, text_to_speech_male_hindi, text)
-        else:
-            file_path = await loop.run_in_executor(None, text_to_speech_female_hindi, text)
-
-        output_queue.put(file_path)
+    def start_tts(self, text, speaker, split=True, audio_config=None):
+        return start_tts(text, speaker_voice(speaker), split, audio_config)
 
     async def generate_agent_response(self, conversation_history, conversation_stage, output_queue, pdf_content):
-        loop = asyncio.get_running_loop()
-        agent_output = await loop.run_in_executor(None, self.podcast_1, pdf_content, conversation_history, conversation_stage)
+        agent_output = await self.podcast_1(pdf_content=pdf_content, conversation_history=conversation_history, current_stage=conversation_stage)
 
         agent_output = json.loads(agent_output)
         output_queue.put((agent_output['Alex_output'], agent_output['conversation_stage'], agent_output['Emma_output']))
 
 
 if __name__ == "__main__":
+    # Whole turns, synthesized on the demo's own threads
+    def speak(text, speaker, output_queue):
+        output_queue.put(synthesize(text, speaker_voice(speaker)))
+
     user_tts_queue = queue.Queue()
     user_output_queue = queue.Queue()
     handleUser = HandelUser()
@@ -85,11 +61,11 @@ if __name__ == "__main__":
         store_chat_history(user_id="id", agent_name="Emma", agent_response=emma_output, agent_conversation_stage=conversation_stage)
 
 
-        thread = threading.Thread(target=handleUser.generate_tts, args=(emma_output, "female", user_tts_queue))
+        thread = threading.Thread(target=speak, args=(emma_output, "Emma", user_tts_queue))
         print(f"Alex: {alex_output}")
         print(f"Emma: {emma_output}")
 
-        handleUser.generate_tts(alex_output, "male", user_tts_queue)
+        speak(alex_output, "Alex", user_tts_queue)
         file_path_male = user_tts_queue.get()
         thread.start()
         print(conversation_stage)
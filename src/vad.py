@@ -0,0 +1,109 @@
+import os
+from collections import deque
+import numpy as np
+
+# Frame length fed to the detector: webrtcvad accepts 10, 20 or 30 ms
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", 20))
+# "webrtc" (webrtcvad, aggressiveness 0-3) or "energy" (RMS threshold)
+VAD_ENGINE = os.getenv("VAD_ENGINE", "webrtc")
+VAD_AGGRESSIVENESS = int(os.getenv("VAD_AGGRESSIVENESS", 2))
+VAD_ENERGY_THRESHOLD = float(os.getenv("VAD_ENERGY_THRESHOLD", 500))  # RMS of int16 samples
+# Speech starts once this share of the last VAD_START_MS is voiced (hysteresis against clicks)
+VAD_START_MS = int(os.getenv("VAD_START_MS", 200))
+VAD_START_RATIO = float(os.getenv("VAD_START_RATIO", 0.6))
+# Speech ends after this much continuous silence (the hangover)
+END_OF_SPEECH_MS = int(os.getenv("END_OF_SPEECH_MS", 700))
+# Give up if the user does not start talking at all
+NO_SPEECH_TIMEOUT_MS = int(os.getenv("NO_SPEECH_TIMEOUT_MS", 10000))
+
+
+def frame_rms(frames):
+    """RMS per row of int16 samples. Squares in float64, int16 squares overflow."""
+    samples = frames.astype(np.float64)
+    return np.sqrt(np.mean(samples * samples, axis=-1))
+
+
+class EnergyDetector:
+    def __init__(self, threshold=VAD_ENERGY_THRESHOLD):
+        self.threshold = threshold
+
+    def voiced(self, frames, sample_rate):
+        """One flag per frame (rows of int16 samples), all computed in one pass."""
+        return frame_rms(frames) >= self.threshold
+
+
+class WebRTCDetector:
+    def __init__(self, aggressiveness=VAD_AGGRESSIVENESS):
+        import webrtcvad
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def voiced(self, frames, sample_rate):
+        return np.array([self.vad.is_speech(frame.tobytes(), sample_rate) for frame in frames], dtype=bool)
+
+
+def make_detector(engine=VAD_ENGINE):
+    if engine == "energy":
+        return EnergyDetector()
+    if engine == "webrtc":
+        return WebRTCDetector()
+    raise ValueError(f"Unknown VAD engine {engine!r}, expected 'webrtc' or 'energy'")
+
+
+class Endpointer:
+    """Cuts incoming 16-bit mono PCM into fixed frames and decides when the user stopped talking.
+
+    feed() takes chunks of any size and returns True once the utterance is over: speech was
+    detected and then END_OF_SPEECH_MS of silence followed, or no speech came within
+    NO_SPEECH_TIMEOUT_MS.
+    """
+
+    def __init__(self, sample_rate, frame_ms=VAD_FRAME_MS, detector=None, start_ms=VAD_START_MS,
+                 start_ratio=VAD_START_RATIO, end_of_speech_ms=END_OF_SPEECH_MS, no_speech_timeout_ms=NO_SPEECH_TIMEOUT_MS):
+        if frame_ms not in (10, 20, 30):
+            raise ValueError("Frames must be 10, 20 or 30 ms")
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self.detector = detector or make_detector()
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.start_ratio = start_ratio
+        self.end_frames = max(1, end_of_speech_ms // frame_ms)
+        self.timeout_frames = max(1, no_speech_timeout_ms // frame_ms)
+
+        self.pending = b""  # Bytes short of a whole frame
+        self.recent = deque(maxlen=self.start_frames)  # Voiced flags before speech started
+        self.in_speech = False
+        self.silent_frames = 0
+        self.frames = 0
+        self.ended = False
+
+    def feed(self, chunk):
+        if self.ended:
+            return True
+
+        data = self.pending + chunk
+        whole = len(data) - len(data) % self.frame_bytes
+        self.pending = data[whole:]
+        if not whole:
+            return False
+
+        frames = np.frombuffer(data[:whole], dtype=np.int16).reshape(-1, self.frame_bytes // 2)
+        for voiced in self.detector.voiced(frames, self.sample_rate):
+            self.frames += 1
+            if not self.in_speech:
+                self.recent.append(voiced)
+                if len(self.recent) == self.start_frames and sum(self.recent) >= self.start_ratio * self.start_frames:
+                    self.in_speech = True
+                    self.silent_frames = 0
+                elif self.frames >= self.timeout_frames:
+                    self.ended = True
+                    break
+            elif voiced:
+                self.silent_frames = 0
+            else:
+                self.silent_frames += 1
+                if self.silent_frames >= self.end_frames:
+                    self.ended = True
+                    break
+
+        return self.ended
@@ -0,0 +1,42 @@
+import os
+import json
+from collections import namedtuple
+
+# encoding: None follows the session's audio format, set it to pin a voice to one encoding
+VoiceProfile = namedtuple("VoiceProfile", ["language_code", "name", "gender", "encoding"], defaults=[None])
+
+VOICES = {
+    "en-US-male": VoiceProfile("en-US", "en-US-Chirp-HD-D", "MALE"),
+    "en-US-female": VoiceProfile("en-US", "en-US-Chirp-HD-F", "FEMALE"),
+    "hi-IN-male": VoiceProfile("hi-IN", "hi-IN-Chirp3-HD-Charon", "MALE"),
+    "hi-IN-female": VoiceProfile("hi-IN", "hi-IN-Chirp3-HD-Aoede", "FEMALE"),
+}
+
+# Who speaks with which voice
+SPEAKER_VOICES = {
+    "Alex": "hi-IN-male",
+    "Emma": "hi-IN-female",
+}
+
+# Optional JSON file adding or overriding voices and speakers, e.g.
+# {"voices": {"ta-IN-female": {"language_code": "ta-IN", "name": "ta-IN-Chirp3-HD-Aoede", "gender": "FEMALE"}},
+#  "speakers": {"Emma": "ta-IN-female"}}
+TTS_VOICES_PATH = os.getenv("TTS_VOICES_PATH")
+
+if TTS_VOICES_PATH:
+    with open(TTS_VOICES_PATH, encoding="utf-8") as voices_file:
+        overrides = json.load(voices_file)
+    VOICES.update({name: VoiceProfile(**profile) for name, profile in overrides.get("voices", {}).items()})
+    SPEAKER_VOICES.update(overrides.get("speakers", {}))
+
+
+def get_voice(name):
+    """Voice profile by registry name."""
+    if name not in VOICES:
+        raise KeyError(f"Unknown voice {name!r}, expected one of {', '.join(VOICES)}")
+    return VOICES[name]
+
+
+def speaker_voice(speaker):
+    """Voice profile a podcast speaker talks with."""
+    return get_voice(SPEAKER_VOICES[speaker])